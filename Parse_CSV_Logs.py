@@ -1,42 +1,45 @@
-import pandas as pd
 import numpy as np
 import csv
 import sys
-import matplotlib.pyplot as plt
 
-if len(sys.argv) < 2:
-    print("\nUsage: python Parse_CSV_Logs.py <logfilepath>\n")
-    sys.exit(1)
 
-LOGFILE_PATH = sys.argv[1]
-HEADERS = []
-OVERTRAVEL = []
-BLOCKAGE = []
-TIME_INDEX_STR = [] 
-INTERNAL_ERROR = []
-CYCLE_COUNT = []
-MOVEMENT_STATUS_STR = []
-ACTUAL_POSITION = []
+def read_log(logfile_path):
+    """
+    Read the columns used by the analysis from a ';' separated log file.
+    Returns:
+        dict: column name -> list of str values.
+    """
+    columns = {
+        'time_index': [],
+        'blockage': [],
+        'overtravel': [],
+        'internal_error': [],
+        'cycle_count': [],
+        'movement_status': [],
+        'actual_position': [],
+    }
 
-with open(LOGFILE_PATH, 'r') as log_file:
-    reader = csv.reader(log_file)
-    index = 0
-    for row in reader:
-        if index == 0:
-            HEADERS = [part.strip() for part in row[0].split(';') if part.strip()] 
-        else:
-            raw_data = [part.strip() for part in row[0].split(';') if part.strip()] 
-            if len(raw_data) > 8:
-                TIME_INDEX_STR.append(raw_data[0]) 
-                BLOCKAGE.append(raw_data[1])
-                OVERTRAVEL.append(raw_data[2])
-                INTERNAL_ERROR.append(raw_data[3])
-                CYCLE_COUNT.append(raw_data[7])
-                MOVEMENT_STATUS_STR.append(raw_data[8])
-                ACTUAL_POSITION.append(raw_data[17])
+    with open(logfile_path, 'r') as log_file:
+        reader = csv.reader(log_file)
+        index = 0
+        for row in reader:
+            if index == 0:
+                columns['headers'] = [part.strip() for part in row[0].split(';') if part.strip()]
             else:
-                print(f"ERROR: raw_data length is not match. {len(raw_data)}")
-        index = index + 1
+                raw_data = [part.strip() for part in row[0].split(';') if part.strip()]
+                if len(raw_data) > 8:
+                    columns['time_index'].append(raw_data[0])
+                    columns['blockage'].append(raw_data[1])
+                    columns['overtravel'].append(raw_data[2])
+                    columns['internal_error'].append(raw_data[3])
+                    columns['cycle_count'].append(raw_data[7])
+                    columns['movement_status'].append(raw_data[8])
+                    columns['actual_position'].append(raw_data[17])
+                else:
+                    print(f"ERROR: raw_data length is not match. {len(raw_data)}")
+            index = index + 1
+
+    return columns
 
 def calculate_movement_time_average(movement_statuses, actual_position_value, time_index_np):
     time_diff_array = []
@@ -56,15 +59,25 @@ def calculate_movement_time_average(movement_statuses, actual_position_value, ti
     return np.mean(time_diff_array)
         
 
-try:
-    time_index_np = np.array(TIME_INDEX_STR, dtype=np.int64)
-    move_status_np = np.array(MOVEMENT_STATUS_STR, dtype=int)
-    actual_positions_np = np.array(ACTUAL_POSITION, dtype=int)
-except ValueError as e:
-    print(f"\nError converting data types: {e}")
-    sys.exit(1)
+def main():
+    if len(sys.argv) < 2:
+        print(f"\nUsage: python {sys.argv[0]} <logfilepath>\n")
+        sys.exit(1)
+
+    columns = read_log(sys.argv[1])
+
+    try:
+        time_index_np = np.array(columns['time_index'], dtype=np.int64)
+        move_status_np = np.array(columns['movement_status'], dtype=int)
+        actual_positions_np = np.array(columns['actual_position'], dtype=int)
+    except ValueError as e:
+        print(f"\nError converting data types: {e}")
+        sys.exit(1)
+
+    average_time = calculate_movement_time_average(move_status_np, actual_positions_np, time_index_np)
 
-average_time = calculate_movement_time_average(move_status_np, actual_positions_np, time_index_np)
 
+    print(average_time)
 
-print(average_time)
+if __name__ == '__main__':
+    main()
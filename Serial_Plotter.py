@@ -1,9 +1,11 @@
 import serial
 import sys
 import time
-import matplotlib.pyplot as plt
 
 def plot_raw_data(raw_data):
+    # matplotlib is slow to import, only load it once the data is captured
+    import matplotlib.pyplot as plt
+
     print("\n=== PLOTTING RAW DATA ===")
     print(f"Raw length: {len(raw_data)} characters\n")
 
@@ -48,11 +50,11 @@ def plot_raw_data(raw_data):
     plt.show()
 
 
-if len(sys.argv) < 2:
-    print("Usage: python Serial_Plot.py <PORT>")
-    print("Example (Windows): python test_serial.py COM3")
-    print("Example (Mac):     python test_serial.py /dev/cu.usbmodem21401")
-    print("Example (Linux):   python test_serial.py /dev/ttyACM0")
+def print_usage():
+    print(f"Usage: python {sys.argv[0]} <PORT>")
+    print(f"Example (Windows): python {sys.argv[0]} COM3")
+    print(f"Example (Mac):     python {sys.argv[0]} /dev/cu.usbmodem21401")
+    print(f"Example (Linux):   python {sys.argv[0]} /dev/ttyACM0")
     print("\nAvailable ports:")
     try:
         import serial.tools.list_ports
@@ -61,62 +63,69 @@ if len(sys.argv) < 2:
             print(f"  {port.device} - {port.description}")
     except Exception as e:
         print(f"  Could not list ports: {e}")
-    sys.exit(1)
 
-port_name = sys.argv[1]
+def main():
+    if len(sys.argv) < 2:
+        print_usage()
+        sys.exit(1)
 
-print(f"Opening {port_name} at 115200 baudrate...")
-print("Press Ctrl+C to exit\n")
+    port_name = sys.argv[1]
 
+    print(f"Opening {port_name} at 115200 baudrate...")
+    print("Press Ctrl+C to exit\n")
 
 
-# Get log filename
-logfile_name = input("Please enter Logfile name (without extension): ").strip()
-if not logfile_name:
-    logfile_name = "LOG"
-logfile_name = logfile_name.replace(" ", "_").upper() + ".log"
 
-with serial.Serial(port_name, 115200, timeout=1) as ser:
-    with open(logfile_name, 'a') as txtfile:
-        try:
-            print(f"Listening on {port_name} at {115200} baud...")
-            ser.flushOutput()
-            ser.flushInput()
-            
-            while True:
-                if ser.in_waiting > 0:
-                    # Read available data
-                    data = ser.readline()
-                    try:
-                        text = data.decode('utf-8', errors='ignore').rstrip()
-                        if text:
-                            print(text)
-                            txtfile.write(text)
-                    except:
-                        # If decode fails, print as hex
-                        print(f"HEX: {data.hex()}")
-                else:
-                    time.sleep(0.001)  # Small delay 
-                
-
-        except serial.SerialException as e:
-            print(f"Error: {e}")
-        except KeyboardInterrupt:
-            ser.close()
-            txtfile.close()
-            print("Program terminated.")
+    # Get log filename
+    logfile_name = input("Please enter Logfile name (without extension): ").strip()
+    if not logfile_name:
+        logfile_name = "LOG"
+    logfile_name = logfile_name.replace(" ", "_").upper() + ".log"
+
+    with serial.Serial(port_name, 115200, timeout=1) as ser:
+        with open(logfile_name, 'a') as txtfile:
             try:
-                with open(logfile_name, 'r') as file:
-                    raw = file.read()
-                raw = raw.strip()  # Remove leading/trailing whitespace and newlines
-                if not raw:
-                    print(f"Error: '{logfile_name}' is empty.")
+                print(f"Listening on {port_name} at {115200} baud...")
+                ser.flushOutput()
+                ser.flushInput()
+
+                while True:
+                    if ser.in_waiting > 0:
+                        # Read available data
+                        data = ser.readline()
+                        try:
+                            text = data.decode('utf-8', errors='ignore').rstrip()
+                            if text:
+                                print(text)
+                                txtfile.write(text)
+                        except:
+                            # If decode fails, print as hex
+                            print(f"HEX: {data.hex()}")
+                    else:
+                        time.sleep(0.001)  # Small delay 
+
+
+            except serial.SerialException as e:
+                print(f"Error: {e}")
+            except KeyboardInterrupt:
+                ser.close()
+                txtfile.close()
+                print("Program terminated.")
+                try:
+                    with open(logfile_name, 'r') as file:
+                        raw = file.read()
+                    raw = raw.strip()  # Remove leading/trailing whitespace and newlines
+                    if not raw:
+                        print(f"Error: '{logfile_name}' is empty.")
+                        sys.exit(1)
+                except FileNotFoundError:
+                    print(f"Error: File '{logfile_name}' not found.")
                     sys.exit(1)
-            except FileNotFoundError:
-                print(f"Error: File '{logfile_name}' not found.")
-                sys.exit(1)
-            except Exception as e:
-                print(f"Error reading file: {e}")
-                sys.exit(1)
-
-            plot_raw_data(raw)
+                except Exception as e:
+                    print(f"Error reading file: {e}")
+                    sys.exit(1)
+
+                plot_raw_data(raw)
+
+if __name__ == '__main__':
+    main()
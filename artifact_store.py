@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+
+'''
+@file artifact_store.py
+@brief: Content addressed store for the release artifacts.
+
+Every file is stored once under <store>/<sha256[:2]>/<sha256> and hard linked
+into the release folders, falling back to a copy where links are not
+supported. Each release folder gets a manifest.json with the name, sha256 and
+size of its files, used to verify the release later on.
+
+A release file and its stored object are the same file on disk: the objects
+are left writable so that old release folders can still be deleted (a read
+only file cannot be deleted on Windows), and an edit made in place is caught
+by the verification instead. Such an edit also changes the stored object, so
+an object is checked against its source before being reused and stored again
+when it no longer matches. Deleting a release folder does not free its
+objects, --gc removes the objects no release manifest refers to.
+
+Usage: python artifact_store.py <release_folder> [<release_folder> ...]
+       verifies the release folders against their manifest.
+       python artifact_store.py --gc <releases_dir> [--store <store_dir>]
+       removes the stored objects no release of releases_dir refers to.
+'''
+import os
+import sys
+import stat
+import json
+import shutil
+import hashlib
+from argparse import ArgumentParser, RawTextHelpFormatter
+from concurrent.futures import ThreadPoolExecutor
+
+MANIFEST_FILENAME = 'manifest.json'
+STORE_DIR_NAME = '.store'
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_sha256(file_path):
+    """
+    Stream a file through sha256.
+    Returns:
+        (str, int): the hex digest and the file size.
+    """
+    sha = hashlib.sha256()
+    size = 0
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            sha.update(block)
+            size += len(block)
+    return sha.hexdigest(), size
+
+
+def hash_files(file_paths):
+    """
+    Hash many files in parallel, hashlib releases the GIL on large blocks.
+    Returns:
+        dict: file path -> (sha256, size).
+    """
+    file_paths = list(dict.fromkeys(file_paths))
+    with ThreadPoolExecutor() as executor:
+        return dict(zip(file_paths, executor.map(file_sha256, file_paths)))
+
+
+def get_object_path(store_dir, digest):
+    return os.path.join(store_dir, digest[:2], digest)
+
+
+def is_object_valid(object_path, digest, size):
+    """
+    Check a stored object against the hash of its source, the object shares its
+    content with every release file linked to it and may have been edited.
+    Returns:
+        bool: True if the object exists and has the expected content.
+    """
+    if not os.path.isfile(object_path):
+        return False
+    if os.path.getsize(object_path) == size and file_sha256(object_path)[0] == digest:
+        return True
+    print(f"/!\\ Warning: {object_path} was modified, storing it again")
+    return False
+
+
+def link_or_copy(src_path, dest_path):
+    """
+    Hard link a stored object, copy it when the file system does not allow it.
+    Returns:
+        bool: True if a link was created.
+    """
+    try:
+        os.link(src_path, dest_path)
+        return True
+    except OSError:
+        shutil.copy2(src_path, dest_path)
+        return False
+
+
+def add_files(store_dir, release_folder, files):
+    """
+    Store files and place them in a release folder.
+    Args:
+        store_dir (str): the store root.
+        release_folder (str): the folder receiving the files.
+        files (dict): name in the release folder -> source path.
+    Returns:
+        (list, int): the manifest entries and the number of bytes copied.
+    """
+    hashes = hash_files(files.values())
+    entries = []
+    bytes_copied = 0
+
+    for name, src_path in files.items():
+        digest, size = hashes[src_path]
+        object_path = get_object_path(store_dir, digest)
+
+        if not is_object_valid(object_path, digest, size):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            tmp_path = object_path + '.tmp'
+            shutil.copy2(src_path, tmp_path)
+            os.replace(tmp_path, object_path)
+            bytes_copied += size
+
+        if not link_or_copy(object_path, os.path.join(release_folder, name)):
+            bytes_copied += size
+
+        entries.append({'name': name, 'sha256': digest, 'size': size})
+
+    return entries, bytes_copied
+
+
+def write_manifest(release_folder, entries):
+    with open(os.path.join(release_folder, MANIFEST_FILENAME), 'w') as f:
+        json.dump({'algorithm': 'sha256', 'files': entries}, f, indent=4)
+
+
+def read_manifest(release_folder):
+    with open(os.path.join(release_folder, MANIFEST_FILENAME), 'r') as f:
+        return json.load(f)['files']
+
+
+def verify_release(release_folder):
+    """
+    Check the files of a release folder against its manifest.
+    Returns:
+        list: the names of the missing or modified files.
+    """
+    entries = read_manifest(release_folder)
+    paths = [os.path.join(release_folder, entry['name']) for entry in entries]
+    existing = [path for path in paths if os.path.isfile(path)]
+    hashes = hash_files(existing)
+
+    errors = []
+    for entry, path in zip(entries, paths):
+        if path not in hashes:
+            errors.append(f"{entry['name']}: missing")
+        elif hashes[path] != (entry['sha256'], entry['size']):
+            errors.append(f"{entry['name']}: content does not match the manifest")
+    return errors
+
+
+def gc_store(store_dir, releases_dir):
+    """
+    Remove the stored objects no release manifest refers to. The objects kept
+    are made writable again, older stores made them read only.
+    Args:
+        store_dir (str): the store root.
+        releases_dir (str): the folder holding the release folders.
+    Returns:
+        (int, int): the number of objects removed and the bytes freed.
+    Raises:
+        IOError: if a manifest cannot be read, nothing is removed then.
+    """
+    referenced = set()
+    for name in os.listdir(releases_dir):
+        release_folder = os.path.join(releases_dir, name)
+        if not os.path.isfile(os.path.join(release_folder, MANIFEST_FILENAME)):
+            continue
+        try:
+            referenced.update(entry['sha256'] for entry in read_manifest(release_folder))
+        except (OSError, ValueError, KeyError) as e:
+            raise IOError(f"Cannot read the manifest of {release_folder}, store left untouched: {e}")
+
+    removed = 0
+    bytes_freed = 0
+    for root, _, files in os.walk(store_dir):
+        for filename in files:
+            object_path = os.path.join(root, filename)
+            os.chmod(object_path, os.stat(object_path).st_mode | stat.S_IWRITE)
+            if filename in referenced:
+                continue
+            bytes_freed += os.path.getsize(object_path)
+            os.remove(object_path)
+            removed += 1
+
+    return removed, bytes_freed
+
+
+def parse_args():
+    """Parse command line arguments"""
+    pars = ArgumentParser(formatter_class=RawTextHelpFormatter, description=__doc__)
+    pars.add_argument('paths', nargs='+', help='release folders to verify, or the releases folder with --gc')
+    pars.add_argument('-g', '--gc', help='remove the stored objects no release refers to', action='store_true', default=False)
+    pars.add_argument('-s', '--store', help=f'store folder, <releases_dir>/{STORE_DIR_NAME} by default', type=str, default=None)
+    return pars.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.gc:
+        failed = False
+        for releases_dir in args.paths:
+            store_dir = args.store or os.path.join(releases_dir, STORE_DIR_NAME)
+            try:
+                removed, bytes_freed = gc_store(store_dir, releases_dir)
+                print(f"{store_dir}: removed {removed} objects, {bytes_freed} bytes freed")
+            except OSError as e:
+                failed = True
+                print(f"{store_dir}: {e}")
+        sys.exit(1 if failed else 0)
+
+    failed = False
+    for release_folder in args.paths:
+        try:
+            errors = verify_release(release_folder)
+        except (OSError, ValueError, KeyError) as e:
+            errors = [f"cannot read manifest: {e}"]
+
+        if errors:
+            failed = True
+            print(f"{release_folder}: FAILED")
+            for error in errors:
+                print(f"    {error}")
+        else:
+            print(f"{release_folder}: OK")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+
+'''
+@file build_analyzer.py
+@brief: Streaming analysis of the build output.
+
+Each line of the build output is timestamped as it is read. A line starting a
+compile unit (a compiler call with -c, or a "Compiling <file>" echo) closes
+the previous unit, so the time of a unit is the time until the next unit or
+the link starts. With a parallel make (-j) the lines of several units
+interleave and the times are only a rough ranking.
+
+GCC style diagnostics (file:line:col: warning: message [-Wflag]) are indexed
+per file, a warning of a header included by several units is kept once with
+its number of occurrences.
+
+Usage: python build_analyzer.py <build.log | build_report.json>
+       Timings are only available in the reports saved at build time.
+'''
+import io
+import re
+import json
+import time
+from argparse import ArgumentParser, RawTextHelpFormatter
+
+SOURCE_FILE_RE_PATTERN = r'(?:^|[\s"])([^\s"]+\.(?:c|cc|cpp|cxx|s|S|asm))(?=[\s"]|$)'
+COMPILE_FLAG_RE_PATTERN = r'(?:^|\s)-c(?:\s|$)'
+COMPILE_ECHO_RE_PATTERN = r'^\s*(?:Compiling|Assembling|CC|AS)\s*:?\s+(\S+)'
+LINK_RE_PATTERN = r'^\s*(?:Linking|LD)\b|\s-o\s+\S+\.elf\b'
+DIAGNOSTIC_RE_PATTERN = (r'^(?P<file>(?:[A-Za-z]:)?[^:\s][^:]*):(?P<line>\d+):(?:(?P<column>\d+):)?\s*'
+                         r'(?P<severity>warning|error):\s*(?P<message>.*?)(?:\s+\[(?P<flag>-W[^\]]+)\])?\s*$')
+
+LINK_UNIT_NAME = '<link>'
+SLOWEST_UNITS_COUNT = 10
+
+SOURCE_FILE_RE = re.compile(SOURCE_FILE_RE_PATTERN)
+COMPILE_FLAG_RE = re.compile(COMPILE_FLAG_RE_PATTERN)
+COMPILE_ECHO_RE = re.compile(COMPILE_ECHO_RE_PATTERN)
+LINK_RE = re.compile(LINK_RE_PATTERN)
+DIAGNOSTIC_RE = re.compile(DIAGNOSTIC_RE_PATTERN)
+
+
+def get_unit_name(line):
+    """
+    The source file compiled by a build output line.
+    Returns:
+        str: the source file, LINK_UNIT_NAME for the link step, None otherwise.
+    """
+    match = COMPILE_ECHO_RE.match(line)
+    if match:
+        return match.group(1)
+    if COMPILE_FLAG_RE.search(line):
+        match = SOURCE_FILE_RE.search(line)
+        if match:
+            return match.group(1)
+    if LINK_RE.search(line):
+        return LINK_UNIT_NAME
+    return None
+
+
+class BuildAnalyzer:
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.start = clock()
+        self.end = None
+        self.line_count = 0
+        self.units = []
+        self.diagnostics = {}
+        self._current_unit = None
+
+    def feed(self, line):
+        """
+        Process one line of the build output.
+        Returns:
+            float: the line timestamp in seconds since the build started.
+        """
+        timestamp = self.clock() - self.start
+        self.line_count += 1
+
+        diagnostic = DIAGNOSTIC_RE.match(line)
+        if diagnostic:
+            self._add_diagnostic(diagnostic)
+            return timestamp
+
+        unit_name = get_unit_name(line)
+        if unit_name is not None:
+            self._close_unit(timestamp)
+            self._current_unit = {'file': unit_name, 'start_s': timestamp, 'duration_s': None, 'diagnostics': 0}
+            self.units.append(self._current_unit)
+        return timestamp
+
+    def close(self):
+        """
+        End of the build output, closes the last unit.
+        """
+        self.end = self.clock() - self.start
+        self._close_unit(self.end)
+
+    def _close_unit(self, timestamp):
+        if self._current_unit is not None:
+            self._current_unit['duration_s'] = timestamp - self._current_unit['start_s']
+            self._current_unit = None
+
+    def _add_diagnostic(self, match):
+        key = (match.group('file'), int(match.group('line')), match.group('severity'), match.group('message'))
+        if key in self.diagnostics:
+            self.diagnostics[key]['count'] += 1
+            return
+        self.diagnostics[key] = {
+            'file': match.group('file'),
+            'line': int(match.group('line')),
+            'column': int(match.group('column')) if match.group('column') else None,
+            'severity': match.group('severity'),
+            'message': match.group('message'),
+            'flag': match.group('flag'),
+            'count': 1,
+            'unit': self._current_unit['file'] if self._current_unit is not None else None,
+        }
+        if self._current_unit is not None:
+            self._current_unit['diagnostics'] += 1
+
+    def slowest_units(self, count=None):
+        units = sorted((unit for unit in self.units if unit['duration_s'] is not None),
+                       key=lambda unit: unit['duration_s'], reverse=True)
+        return units[:count] if count is not None else units
+
+    def diagnostics_by_file(self, severity=None):
+        by_file = {}
+        for diagnostic in self.diagnostics.values():
+            if severity is None or diagnostic['severity'] == severity:
+                by_file.setdefault(diagnostic['file'], []).append(diagnostic)
+        for file_diagnostics in by_file.values():
+            file_diagnostics.sort(key=lambda diagnostic: diagnostic['line'])
+        return dict(sorted(by_file.items()))
+
+    def warning_counts(self):
+        """
+        Number of distinct warnings per -W flag, most frequent first.
+        """
+        counts = {}
+        for diagnostic in self.diagnostics.values():
+            if diagnostic['severity'] == 'warning':
+                flag = diagnostic['flag'] or 'other'
+                counts[flag] = counts.get(flag, 0) + 1
+        return dict(sorted(counts.items(), key=lambda item: item[1], reverse=True))
+
+    def to_dict(self):
+        return {
+            'total_s': round(self.end if self.end is not None else self.clock() - self.start, 3),
+            'lines': self.line_count,
+            'units': [dict(unit, start_s=round(unit['start_s'], 3), duration_s=round(unit['duration_s'], 3))
+                      for unit in self.slowest_units()],
+            'warning_counts': self.warning_counts(),
+            'diagnostics': self.diagnostics_by_file(),
+        }
+
+
+def analyze_stream(stream, analyzer=None, echo=print, encoding='utf-8'):
+    """
+    Analyze a binary build output stream, such as a Popen stdout, as it is read.
+    Args:
+        stream: binary file object, decoded incrementally instead of line by line.
+        echo: called with each line, None to stay quiet.
+    Returns:
+        BuildAnalyzer: closed at the end of the stream.
+    """
+    analyzer = analyzer if analyzer is not None else BuildAnalyzer()
+    text = io.TextIOWrapper(stream, encoding=encoding, errors='replace')
+    for line in text:
+        line = line.rstrip()
+        analyzer.feed(line)
+        if echo is not None:
+            echo(line)
+    analyzer.close()
+    return analyzer
+
+
+def print_report(report, count=SLOWEST_UNITS_COUNT, diagnostics=True):
+    units = [unit for unit in report['units'] if unit['file'] != LINK_UNIT_NAME]
+    print(f"Build: {report['total_s']:.1f}s, {len(units)} compile units, {report['lines']} lines")
+
+    if units:
+        print(f"\n{'Slowest units':<48} {'Time (s)':>10} {'Diagnostics':>12}")
+        for unit in units[:count]:
+            print(f"{unit['file'][-48:]:<48} {unit['duration_s']:>10.2f} {unit['diagnostics']:>12}")
+
+    if report['warning_counts']:
+        print(f"\n{'Warning flag':<36} {'Count':>6}")
+        for flag, flag_count in report['warning_counts'].items():
+            print(f"{flag:<36} {flag_count:>6}")
+
+    if not diagnostics:
+        return
+    for file_name, diagnostics in report['diagnostics'].items():
+        print(f"\n{file_name}")
+        for diagnostic in diagnostics:
+            repeat = f" (x{diagnostic['count']})" if diagnostic['count'] > 1 else ''
+            flag = f" [{diagnostic['flag']}]" if diagnostic['flag'] else ''
+            print(f"  {diagnostic['line']:>5}: {diagnostic['severity']}: {diagnostic['message']}{flag}{repeat}")
+
+
+def parse_args():
+    """Parse command line arguments"""
+    pars = ArgumentParser(formatter_class=RawTextHelpFormatter, description=__doc__)
+    pars.add_argument('file', help='build log, or build report saved in a release folder')
+    pars.add_argument('-n', '--count', help='number of slowest units to print', type=int, default=SLOWEST_UNITS_COUNT)
+    return pars.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.file.endswith('.json'):
+        with open(args.file, 'r') as f:
+            report = json.load(f)
+    else:
+        with open(args.file, 'rb') as f:
+            report = analyze_stream(f, echo=None).to_dict()
+    print_report(report, args.count)
+
+
+if __name__ == '__main__':
+    main()
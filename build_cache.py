@@ -0,0 +1,201 @@
+'''
+@file build_cache.py
+@brief: Cache of firmware build objects keyed by a fingerprint of the build inputs.
+
+The fingerprint covers the source files, the toolchain version and any extra
+input given by the caller (Makefile configuration...). Values changing at
+every release, like the version defines, are normalised out of the files
+holding them, so a release build matches the build of the previous release.
+
+The cache keeps the object files (.o, .d...) of a build, not its .hex/.elf:
+those embed the version. A build whose fingerprint is in the cache restores
+the objects, after checking their sha256, dated just before the version
+bump. The incremental build then only recompiles the units depending on the
+version headers and links, the other objects are reused.
+
+The cache lives in the git common directory so it is never committed and is
+shared between the worktrees of a repo.
+'''
+import os
+import re
+import json
+import shutil
+import hashlib
+
+from artifact_store import hash_files
+from generated_header import get_git_dir, get_common_dir
+
+BUILD_CACHE_DIR_NAME = 'build-cache'
+BUILD_CACHE_MANIFEST = 'manifest.json'
+# Number of builds kept in the cache
+BUILD_CACHE_SIZE = 10
+
+SOURCE_EXTENSIONS = ('.c', '.h', '.s', '.S', '.asm', '.inc', '.ld', '.mk')
+SOURCE_FILENAMES  = ('Makefile', 'build.bat')
+
+# Generated during the build from the commit hash and the date
+EXCLUDED_FILENAMES = ('internal_version.h',)
+
+# Build outputs kept in the cache
+OBJECT_EXTENSIONS = ('.o', '.obj', '.d', '.a')
+
+
+def get_cache_dir(repo_path):
+    return os.path.join(get_common_dir(get_git_dir(repo_path)), BUILD_CACHE_DIR_NAME)
+
+
+def list_source_files(source_dir):
+    """
+    List the build input files under a directory, sorted so the fingerprint is stable.
+    """
+    source_files = []
+    for root, dirs, files in os.walk(source_dir):
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for filename in files:
+            if filename in EXCLUDED_FILENAMES:
+                continue
+            if filename.endswith(SOURCE_EXTENSIONS) or filename in SOURCE_FILENAMES:
+                source_files.append(os.path.join(root, filename))
+    return sorted(source_files)
+
+
+def list_build_outputs(build_dir):
+    """
+    List the object files of a build, the outputs kept in the cache.
+    """
+    outputs = []
+    for root, dirs, files in os.walk(build_dir):
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        outputs.extend(os.path.join(root, filename) for filename in files if filename.endswith(OBJECT_EXTENSIONS))
+    return sorted(outputs)
+
+
+def normalized_sha256(file_path, patterns):
+    """
+    sha256 of a file with every match of the regex patterns removed.
+    """
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        text = f.read()
+    for pattern in patterns:
+        text = re.sub(pattern, '', text)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def compute_fingerprint(repo_path, source_dirs, toolchain_version, extra_files=(), normalize=None):
+    """
+    Hash every input of a build.
+    Args:
+        repo_path (str): the repo root, paths are hashed relative to it.
+        source_dirs (list): directories holding the sources.
+        toolchain_version (str): the compiler version string.
+        extra_files (list): other input files, e.g. Makefile.configure.mk.
+        normalize (dict): file path -> regex patterns removed from the file
+            before hashing it, e.g. the version defines of system_settings.h.
+    Returns:
+        str: the sha256 hex digest of the inputs.
+    """
+    normalize = {os.path.abspath(path): patterns for path, patterns in (normalize or {}).items()}
+
+    sha = hashlib.sha256()
+    sha.update(toolchain_version.strip().encode('utf-8') + b'\0')
+
+    input_files = []
+    for source_dir in source_dirs:
+        input_files.extend(list_source_files(source_dir))
+    input_files.extend(extra_files)
+    input_files = sorted(set(input_files))
+
+    hashes = hash_files(path for path in input_files if os.path.abspath(path) not in normalize)
+    for file_path in input_files:
+        relative_path = os.path.relpath(file_path, repo_path).replace(os.sep, '/')
+        patterns = normalize.get(os.path.abspath(file_path))
+        digest = normalized_sha256(file_path, patterns) if patterns is not None else hashes[file_path][0]
+        sha.update(relative_path.encode('utf-8') + b'\0')
+        sha.update(digest.encode('ascii'))
+
+    return sha.hexdigest()
+
+
+def restore_build(cache_dir, fingerprint, repo_path, mtime):
+    """
+    Copy the cached objects of a build back in place.
+    Args:
+        cache_dir (str): the cache folder.
+        fingerprint (str): the build inputs fingerprint.
+        repo_path (str): the repo root, the objects are stored relative to it.
+        mtime (float): modification time given to the restored objects. It
+            must be older than the inputs changed since the cached build (the
+            version headers), so the build recompiles the units using them.
+    Returns:
+        int: the number of objects restored, 0 on a cache miss or if a
+             cached file does not match its manifest.
+    """
+    entry_dir = os.path.join(cache_dir, fingerprint)
+    manifest_path = os.path.join(entry_dir, BUILD_CACHE_MANIFEST)
+    if not os.path.isfile(manifest_path):
+        return 0
+
+    with open(manifest_path, 'r') as f:
+        manifest = json.load(f)
+
+    cached_paths = {relative_path: os.path.join(entry_dir, relative_path) for relative_path in manifest}
+    hashes = hash_files(path for path in cached_paths.values() if os.path.isfile(path))
+    for relative_path, cached_path in cached_paths.items():
+        if cached_path not in hashes or hashes[cached_path][0] != manifest[relative_path]:
+            print(f"/!\\ Warning: cached {relative_path} is missing or corrupted, rebuilding")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return 0
+
+    for relative_path, cached_path in cached_paths.items():
+        output_path = os.path.join(repo_path, relative_path)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        shutil.copyfile(cached_path, output_path)
+        os.utime(output_path, (mtime, mtime))
+
+    # mark the entry as recently used for pruning
+    os.utime(manifest_path)
+    return len(manifest)
+
+
+def store_build(cache_dir, fingerprint, repo_path, output_paths, keep=BUILD_CACHE_SIZE):
+    """
+    Store the objects of a successful build.
+    Args:
+        output_paths (list): the objects, see list_build_outputs().
+    """
+    entry_dir = os.path.join(cache_dir, fingerprint)
+    tmp_dir = entry_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    manifest = {}
+    hashes = hash_files(output_paths)
+    for output_path in output_paths:
+        relative_path = os.path.relpath(output_path, repo_path).replace(os.sep, '/')
+        cached_path = os.path.join(tmp_dir, relative_path)
+        os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+        shutil.copyfile(output_path, cached_path)
+        manifest[relative_path] = hashes[output_path][0]
+
+    with open(os.path.join(tmp_dir, BUILD_CACHE_MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=4)
+
+    # swap the complete entry in, a half written entry is never visible
+    shutil.rmtree(entry_dir, ignore_errors=True)
+    os.replace(tmp_dir, entry_dir)
+
+    prune_cache(cache_dir, keep)
+
+
+def prune_cache(cache_dir, keep=BUILD_CACHE_SIZE):
+    """
+    Remove the least recently used builds, keeping the last `keep` ones.
+    """
+    entries = []
+    for name in os.listdir(cache_dir):
+        manifest_path = os.path.join(cache_dir, name, BUILD_CACHE_MANIFEST)
+        if os.path.isfile(manifest_path):
+            entries.append((os.path.getmtime(manifest_path), name))
+
+    for _, name in sorted(entries, reverse=True)[keep:]:
+        shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
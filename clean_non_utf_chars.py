@@ -1,5 +1,9 @@
 import os
-import chardet
+import sys
+from argparse import ArgumentParser, RawTextHelpFormatter
+
+PROJECT_DIRECTORY = '../code/src/'  # Change this to your project directory
+SOURCE_EXTENSIONS = ('.c', '.h')
 
 def is_utf8(text):
     try:
@@ -8,7 +12,19 @@ def is_utf8(text):
         return False
     return True
 
+def is_utf8_file(file_path):
+    with open(file_path, 'rb') as file:
+        raw_data = file.read()
+    try:
+        raw_data.decode('utf-8')
+    except UnicodeDecodeError:
+        return False
+    return True
+
 def detect_encoding(file_path):
+    # chardet is slow to import, only the cleaning needs it
+    import chardet
+
     with open(file_path, 'rb') as file:
         raw_data = file.read()
         result = chardet.detect(raw_data)
@@ -32,20 +48,44 @@ def clean_file(file_path, encoding):
     with open(file_path, 'w', encoding=new_encoding) as file:
         file.writelines(cleaned_lines)
 
+def get_source_files(paths):
+    """
+    The .c and .h files of the given directories, files are kept as they are.
+    """
+    for path in paths:
+        if os.path.isfile(path):
+            yield path
+            continue
+        for root, _, files in os.walk(path):
+            for filename in files:
+                if filename.endswith(SOURCE_EXTENSIONS):
+                    yield os.path.join(root, filename)
+
+def parse_args():
+    """Parse command line arguments"""
+    pars = ArgumentParser(formatter_class=RawTextHelpFormatter,
+                          description='Remove the non UTF-8 characters of the source files.')
+    pars.add_argument('paths', nargs='*', help='directories or files', default=[PROJECT_DIRECTORY])
+    pars.add_argument('-c', '--check', help='only list the files that are not valid UTF-8', action='store_true', default=False)
+    return pars.parse_args()
+
 def main():
-    project_directory = '../code/src/'  # Change this to your project directory
-
-    for root, _, files in os.walk(project_directory):
-        for filename in files:
-            if filename.endswith('.c') or filename.endswith('.h'):
-                file_path = os.path.join(root, filename)
-                try:
-                    encoding = detect_encoding(file_path)
-                    print(f"cleaning file {file_path} with encoding {encoding}")
-                    clean_file(file_path, encoding)
-                except Exception as e:
-                    print(f"Error processing file: {file_path}")
-                    print(e)
+    args = parse_args()
+
+    if args.check:
+        invalid_files = [file_path for file_path in get_source_files(args.paths) if not is_utf8_file(file_path)]
+        for file_path in invalid_files:
+            print(f"not UTF-8: {file_path}")
+        sys.exit(1 if invalid_files else 0)
+
+    for file_path in get_source_files(args.paths):
+        try:
+            encoding = detect_encoding(file_path)
+            print(f"cleaning file {file_path} with encoding {encoding}")
+            clean_file(file_path, encoding)
+        except Exception as e:
+            print(f"Error processing file: {file_path}")
+            print(e)
 
 if __name__ == "__main__":
     main()
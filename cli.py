@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+'''
+@file cli.py
+@brief: Single entry point for the scripts.
+
+Each command runs the main() of its script, with the arguments following the
+command. A script is only imported when its command runs, so its heavy
+dependencies (numpy, matplotlib, chardet, gitobj...) are not loaded by the
+quick commands.
+
+Usage: python cli.py <command> [args...]
+       python cli.py <command> --help
+       python cli.py benchmark [--repeat 5]
+'''
+import os
+import sys
+import time
+import importlib
+import subprocess
+from argparse import ArgumentParser, RawTextHelpFormatter, REMAINDER
+
+# command -> (module, function, help)
+COMMANDS = {
+    'logs':           ('Parse_CSV_Logs',        'main', 'movement time average of a CSV log'),
+    'capture':        ('Serial_Plotter',        'main', 'capture and plot serial data'),
+    'clean':          ('clean_non_utf_chars',   'main', 'remove the non UTF-8 characters of the sources, --check to only list them'),
+    'version-header': ('create_version_header', 'main', 'generate internal_version.h'),
+    'pid':            ('fid_2_pid',             'main', 'convert LIN frame ids to PIDs and back'),
+    'lin':            ('lin_decoder',           'main', 'decode a raw LIN capture'),
+    'release':        ('publish_release',       'run',  'publish a release'),
+    'catalog':        ('release_catalog',       'main', 'query the release catalog'),
+    'sizes':          ('elf_sizes',             'main', 'ELF section sizes and size history'),
+    'build-report':   ('build_analyzer',        'main', 'slowest compile units and warnings of a build'),
+    'verify':         ('artifact_store',        'main', 'verify release folders against their manifest, --gc to clean the store'),
+}
+
+# Quick commands timed by the benchmark command, and the startup time they should stay under
+BENCHMARK_COMMANDS = (
+    ('help',           ['--help']),
+    ('pid',            ['pid', '0x34']),
+    ('clean --check',  ['clean', '--check', os.path.abspath(__file__)]),
+)
+STARTUP_BUDGET_S = 0.1
+DEFAULT_BENCHMARK_REPEAT = 5
+
+
+def run_command(command, args):
+    module_name, function_name, _ = COMMANDS[command]
+    # the script parses its own arguments, show it as "cli.py <command>" in its help
+    sys.argv = [f"{os.path.basename(__file__)} {command}", *args]
+    module = importlib.import_module(module_name)
+    return getattr(module, function_name)()
+
+
+def benchmark(repeat=DEFAULT_BENCHMARK_REPEAT):
+    """
+    Time the startup of the quick commands, each in a new interpreter.
+    Returns:
+        bool: True if every command starts within STARTUP_BUDGET_S.
+    """
+    # the interpreter startup alone, to tell it apart from the imports
+    commands = [('python', [sys.executable, '-c', 'pass'])]
+    commands += [(name, [sys.executable, os.path.abspath(__file__), *args]) for name, args in BENCHMARK_COMMANDS]
+
+    print(f"{'Command':<20} {'Best (ms)':>10} {'Median (ms)':>12}")
+    within_budget = True
+    for name, command in commands:
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            durations.append(time.perf_counter() - start)
+        durations.sort()
+        median = durations[len(durations) // 2]
+        over_budget = name != 'python' and median > STARTUP_BUDGET_S
+        within_budget = within_budget and not over_budget
+        warning = '  /!\\ over budget' if over_budget else ''
+        print(f"{name:<20} {durations[0] * 1000:>10.1f} {median * 1000:>12.1f}{warning}")
+
+    print(f"\nBudget: {STARTUP_BUDGET_S * 1000:.0f} ms per command")
+    return within_budget
+
+
+def parse_args():
+    """Parse command line arguments"""
+    commands_help = '\n'.join(f"  {command:<16} {help_text}" for command, (_, _, help_text) in COMMANDS.items())
+    pars = ArgumentParser(formatter_class=RawTextHelpFormatter, description=__doc__,
+                          epilog=f"commands:\n{commands_help}\n  {'benchmark':<16} time the startup of the quick commands")
+    pars.add_argument('command', help='command to run', choices=[*COMMANDS, 'benchmark'], metavar='command')
+    pars.add_argument('args', help='arguments of the command', nargs=REMAINDER)
+    return pars.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.command == 'benchmark':
+        bench = ArgumentParser(prog=f"{os.path.basename(__file__)} benchmark")
+        bench.add_argument('-r', '--repeat', help='runs per command', type=int, default=DEFAULT_BENCHMARK_REPEAT)
+        bench_args = bench.parse_args(args.args)
+        sys.exit(0 if benchmark(bench_args.repeat) else 1)
+
+    run_command(args.command, args.args)
+
+
+if __name__ == '__main__':
+    main()
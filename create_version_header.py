@@ -1,21 +1,30 @@
 import os
-import subprocess
 from datetime import date
 
 from get_root_path import get_root_path
+from generated_header import read_git_head, write_header
+
+
+def get_version_defines(repo_path):
+    """
+    Get the (name, value) pairs written in internal_version.h
+    """
+    git_hash = read_git_head(repo_path)[:6]
+    today = date.today()
+    return [
+        ('GIT_COMMIT', f'0x{git_hash}'),
+        ('RELEASE_YEAR', today.strftime('%y')),
+        ('RELEASE_WEEK', today.strftime('%W')),
+    ]
 
 
 def main():
     print('Creating version header file...')
-    git_hash = subprocess.check_output('git rev-parse --short=6 HEAD', shell=True).decode('ascii').strip()
-    today = date.today()
+    written = write_header(os.path.join(get_root_path(), 'code', 'src', 'internal_version.h'),
+                           get_version_defines(get_root_path()))
 
-    with open(os.path.join(get_root_path(), 'code', 'src', 'internal_version.h'), 'w') as f:
-        f.write(f'''#pragma once
-#define GIT_COMMIT 0x{git_hash}
-#define RELEASE_YEAR {today.strftime('%y')}
-#define RELEASE_WEEK {today.strftime('%W')}
-''')
+    if not written:
+        print('Version header is up to date.')
 
 
 if __name__ == '__main__':
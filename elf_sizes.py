@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+'''
+@file elf_sizes.py
+@brief: Read the section sizes of an ELF file without the toolchain,
+and keep a history of the firmware size across releases.
+
+The section headers are read from a memory mapped view of the file, only the
+headers and the section name table are touched. The history is a CSV file
+with one line per release, appended at each release.
+
+Usage: python elf_sizes.py sections <file.elf>
+       python elf_sizes.py history <size_history.csv> [--plot]
+'''
+import os
+import csv
+import mmap
+import struct
+from argparse import ArgumentParser, RawTextHelpFormatter
+
+ELF_MAGIC = b'\x7fELF'
+ELFCLASS32 = 1
+ELFCLASS64 = 2
+ELFDATA2LSB = 1
+ELFDATA2MSB = 2
+
+SHN_XINDEX = 0xffff
+SHF_ALLOC  = 0x2
+
+# e_shoff, e_shentsize, e_shnum, e_shstrndx offsets and formats per class
+ELF_HEADER_LAYOUT = {
+    ELFCLASS32: {'shoff': (0x20, 'I'), 'shentsize': (0x2E, 'H'), 'shnum': (0x30, 'H'), 'shstrndx': (0x32, 'H')},
+    ELFCLASS64: {'shoff': (0x28, 'Q'), 'shentsize': (0x3A, 'H'), 'shnum': (0x3C, 'H'), 'shstrndx': (0x3E, 'H')},
+}
+
+# sh_name, sh_type, sh_flags, sh_offset, sh_size of a section header
+SECTION_HEADER_FORMAT = {
+    ELFCLASS32: 'III4xII16x',
+    ELFCLASS64: 'IIQ8xQQ24x',
+}
+
+HISTORY_FIELDS = ('timestamp', 'version', 'commit', 'chip',
+                  'flash_used', 'flash_total', 'ram_used', 'ram_total', 'sections')
+
+
+def read_section_sizes(elf_path, alloc_only=True):
+    """
+    Read the size of every section of an ELF file.
+    Args:
+        elf_path (str): path to the .elf file.
+        alloc_only (bool): only the sections loaded on the target (SHF_ALLOC).
+    Returns:
+        dict: section name -> size in bytes, in the file order.
+    Raises:
+        IOError: if the file is not a valid ELF file.
+    """
+    with open(elf_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < 0x40:
+            raise IOError(f"{elf_path} is too small to be an ELF file")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as elf:
+            return _read_section_sizes(elf, elf_path, alloc_only)
+
+
+def _read_section_sizes(elf, elf_path, alloc_only):
+    if elf[:4] != ELF_MAGIC:
+        raise IOError(f"{elf_path} is not an ELF file")
+
+    elf_class = elf[4]
+    if elf_class not in ELF_HEADER_LAYOUT:
+        raise IOError(f"{elf_path}: unknown ELF class {elf_class}")
+    endian = '<' if elf[5] == ELFDATA2LSB else '>'
+
+    def header_field(name):
+        offset, fmt = ELF_HEADER_LAYOUT[elf_class][name]
+        return struct.unpack_from(endian + fmt, elf, offset)[0]
+
+    shoff = header_field('shoff')
+    shentsize = header_field('shentsize')
+    shnum = header_field('shnum')
+    shstrndx = header_field('shstrndx')
+    if shoff == 0:
+        return {}
+
+    section_format = endian + SECTION_HEADER_FORMAT[elf_class]
+
+    def section_header(index):
+        return struct.unpack_from(section_format, elf, shoff + index * shentsize)
+
+    # more than 0xff00 sections: the real count and name table index live in section 0
+    if shnum == 0 or shstrndx == SHN_XINDEX:
+        first = struct.unpack_from(endian + ('IIIIIIII' if elf_class == ELFCLASS32 else 'IIQQQQII'), elf, shoff)
+        shnum = shnum or first[5]
+        shstrndx = first[6] if shstrndx == SHN_XINDEX else shstrndx
+
+    if shoff + shnum * shentsize > len(elf):
+        raise IOError(f"{elf_path}: section headers are truncated")
+
+    strtab_offset = section_header(shstrndx)[3]
+
+    sizes = {}
+    for index in range(1, shnum):
+        name_offset, _, flags, _, size = section_header(index)
+        if alloc_only and not flags & SHF_ALLOC:
+            continue
+        name_end = elf.find(b'\0', strtab_offset + name_offset)
+        name = elf[strtab_offset + name_offset:name_end].decode('ascii', errors='replace')
+        sizes[name] = sizes.get(name, 0) + size
+    return sizes
+
+
+def append_history(history_path, row):
+    """
+    Append one release to the size history.
+    Args:
+        history_path (str): the CSV file, created with its header if missing.
+        row (dict): HISTORY_FIELDS values, 'sections' is a name -> size dict.
+    """
+    row = dict(row)
+    row['sections'] = ';'.join(f'{name}={size}' for name, size in row['sections'].items())
+    write_header = not os.path.isfile(history_path)
+    with open(history_path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=HISTORY_FIELDS)
+        if write_header:
+            writer.writeheader()
+        writer.writerow(row)
+
+
+def load_history(history_path):
+    """
+    Load the size history.
+    Returns:
+        list: one dict per release, sizes as int and sections as a dict.
+    """
+    history = []
+    with open(history_path, 'r', newline='') as f:
+        for row in csv.DictReader(f):
+            for field in ('flash_used', 'flash_total', 'ram_used', 'ram_total'):
+                row[field] = int(row[field])
+            row['sections'] = {name: int(size) for name, size in
+                               (item.split('=') for item in row['sections'].split(';') if item)}
+            history.append(row)
+    return history
+
+
+def plot_history(history):
+    import matplotlib.pyplot as plt
+
+    versions = [row['version'] for row in history]
+    plt.figure(figsize=(14, 7))
+    plt.plot(versions, [row['flash_used'] / 1024 for row in history], marker='o', label='Flash used (kB)')
+    plt.plot(versions, [row['ram_used'] / 1024 for row in history], marker='o', label='RAM used (kB)')
+    plt.title('Firmware size per release', fontsize=16)
+    plt.xlabel('Release', fontsize=12)
+    plt.xticks(rotation=90)
+    plt.grid(True, alpha=0.3)
+    plt.legend()
+    plt.tight_layout()
+    plt.show()
+
+
+def parse_args():
+    """Parse command line arguments"""
+    pars = ArgumentParser(formatter_class=RawTextHelpFormatter, description=__doc__)
+    subparsers = pars.add_subparsers(dest='command', required=True)
+
+    sections = subparsers.add_parser('sections', help='print the section sizes of an ELF file')
+    sections.add_argument('elf', help='ELF file')
+    sections.add_argument('-a', '--all', help='include the sections not loaded on the target', action='store_true', default=False)
+
+    history = subparsers.add_parser('history', help='print the firmware size history')
+    history.add_argument('history', help='size history CSV file')
+    history.add_argument('-p', '--plot', help='plot the flash and RAM usage', action='store_true', default=False)
+
+    return pars.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.command == 'sections':
+        for name, size in read_section_sizes(args.elf, alloc_only=not args.all).items():
+            print(f"{name:<24} {size:>10}")
+    else:
+        history = load_history(args.history)
+        print(f"{'Version':<16} {'Commit':<10} {'Chip':<12} {'Flash':>16} {'RAM':>14}")
+        for row in history:
+            print(f"{row['version']:<16} {row['commit'][:8]:<10} {row['chip']:<12} "
+                  f"{row['flash_used']:>7}/{row['flash_total']:<8} {row['ram_used']:>6}/{row['ram_total']:<7}")
+        if args.plot:
+            plot_history(history)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,12 @@
-def fid_2_pid(frame_id):
-    """ Update a frame identifier with its parity bits.
-    Args:
-        frame_id (byte): the frame id to be converted to protected fid.
-    Returns:
-        byte: the protected frame identifier.
+import functools
+from argparse import ArgumentParser, RawTextHelpFormatter
+
+INVALID_FID = -1
+
+
+def _compute_pid(frame_id):
+    """ Update a frame identifier with its parity bits, bit by bit.
+    Only used to build the lookup tables, use fid_2_pid() instead.
     """
     parity_b0 = 0
     parity_b1 = 0
@@ -28,6 +31,112 @@ def fid_2_pid(frame_id):
     return frame_pid
 
 
-fid= 0x34
-print(fid_2_pid(fid))
-print(hex(fid_2_pid(fid)))
+# FID (0..63) -> PID
+PID_TABLE = bytes(_compute_pid(fid) for fid in range(64))
+
+# PID (0..255) -> FID, INVALID_FID when the parity bits do not match
+FID_TABLE = tuple(PID_TABLE.index(pid) if pid in PID_TABLE else INVALID_FID for pid in range(256))
+
+# PID (0..255) -> parity is valid
+PID_VALID_TABLE = tuple(fid != INVALID_FID for fid in FID_TABLE)
+
+
+
+@functools.lru_cache(maxsize=None)
+def _numpy_tables():
+    """ NumPy copies of the tables for the vectorized functions.
+    NumPy is only imported here, a single lookup does not need it.
+    """
+    import numpy as np
+    return (np,
+            np.frombuffer(PID_TABLE, dtype=np.uint8),
+            np.array(FID_TABLE, dtype=np.int8),
+            np.array(PID_VALID_TABLE, dtype=bool))
+
+
+def fid_2_pid(frame_id):
+    """ Update a frame identifier with its parity bits.
+    Args:
+        frame_id (byte): the frame id to be converted to protected fid.
+    Returns:
+        byte: the protected frame identifier.
+    """
+    return PID_TABLE[frame_id & 0x3f]
+
+
+def pid_2_fid(frame_pid):
+    """ Strip the parity bits of a protected frame identifier.
+    Args:
+        frame_pid (byte): the protected frame identifier.
+    Returns:
+        byte: the frame id.
+    Raises:
+        ValueError: if the parity bits are wrong.
+    """
+    frame_id = FID_TABLE[frame_pid & 0xff]
+    if frame_id == INVALID_FID:
+        raise ValueError(f"Invalid parity in PID 0x{frame_pid:02X}")
+    return frame_id
+
+
+def is_valid_pid(frame_pid):
+    """ Check the parity bits of a protected frame identifier. """
+    return PID_VALID_TABLE[frame_pid & 0xff]
+
+
+def fids_2_pids(frame_ids):
+    """ Vectorized fid_2_pid().
+    Args:
+        frame_ids (array like): frame ids, only the 6 lower bits are used.
+    Returns:
+        np.ndarray: uint8 array of protected frame identifiers.
+    """
+    np, pid_table, _, _ = _numpy_tables()
+    return pid_table[np.asarray(frame_ids) & 0x3f]
+
+
+def pids_2_fids(frame_pids):
+    """ Vectorized pid_2_fid().
+    Args:
+        frame_pids (array like): protected frame identifiers.
+    Returns:
+        np.ndarray: int8 array of frame ids, INVALID_FID where the parity is wrong.
+    """
+    np, _, fid_table, _ = _numpy_tables()
+    return fid_table[np.asarray(frame_pids) & 0xff]
+
+
+def validate_pids(frame_pids):
+    """ Vectorized is_valid_pid().
+    Args:
+        frame_pids (array like): protected frame identifiers.
+    Returns:
+        np.ndarray: bool array, True where the parity is valid.
+    """
+    np, _, _, pid_valid_table = _numpy_tables()
+    return pid_valid_table[np.asarray(frame_pids) & 0xff]
+
+
+def parse_args():
+    """Parse command line arguments"""
+    pars = ArgumentParser(formatter_class=RawTextHelpFormatter,
+                          description='Convert LIN frame ids to protected ids (PID) and back.')
+    pars.add_argument('ids', nargs='+', help='frame ids, e.g. 0x34 or 52', type=lambda value: int(value, 0))
+    pars.add_argument('-r', '--reverse', help='convert PIDs to frame ids', action='store_true', default=False)
+    return pars.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    for value in args.ids:
+        if not args.reverse:
+            print(f"FID 0x{value & 0x3f:02X} -> PID 0x{fid_2_pid(value):02X}")
+        elif is_valid_pid(value):
+            print(f"PID 0x{value & 0xff:02X} -> FID 0x{pid_2_fid(value):02X}")
+        else:
+            print(f"PID 0x{value & 0xff:02X} -> invalid parity")
+
+
+if __name__ == '__main__':
+    main()
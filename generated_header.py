@@ -0,0 +1,127 @@
+import os
+
+
+def get_git_dir(repo_path):
+    """
+    Resolve the .git directory of a repo, following the "gitdir:" pointer
+    used by worktrees and submodules.
+    """
+    git_path = os.path.join(repo_path, '.git')
+    if os.path.isfile(git_path):
+        with open(git_path, 'r') as f:
+            gitdir = f.read().strip()
+        if not gitdir.startswith('gitdir:'):
+            raise IOError(f"Unexpected .git file content in {git_path}")
+        gitdir = gitdir[len('gitdir:'):].strip()
+        if not os.path.isabs(gitdir):
+            gitdir = os.path.join(repo_path, gitdir)
+        return os.path.normpath(gitdir)
+    return git_path
+
+
+def get_common_dir(git_dir):
+    """
+    Get the directory holding the shared refs, worktrees keep only HEAD locally.
+    """
+    commondir_path = os.path.join(git_dir, 'commondir')
+    if os.path.isfile(commondir_path):
+        with open(commondir_path, 'r') as f:
+            common_dir = f.read().strip()
+        return os.path.normpath(os.path.join(git_dir, common_dir))
+    return git_dir
+
+
+def read_symbolic_head(git_dir):
+    """
+    Read HEAD, returns (ref_name, None) when HEAD points to a branch
+    or (None, commit_hash) when detached.
+    """
+    with open(os.path.join(git_dir, 'HEAD'), 'r') as f:
+        head = f.read().strip()
+    if head.startswith('ref:'):
+        return head[len('ref:'):].strip(), None
+    return None, head
+
+
+def resolve_ref(git_dir, ref_name):
+    """
+    Resolve a ref like refs/heads/develop to its commit hash,
+    looking at the loose ref first and then at packed-refs.
+    """
+    for base_dir in (git_dir, get_common_dir(git_dir)):
+        loose_ref_path = os.path.join(base_dir, *ref_name.split('/'))
+        if os.path.isfile(loose_ref_path):
+            with open(loose_ref_path, 'r') as f:
+                return f.read().strip()
+
+    packed_refs_path = os.path.join(get_common_dir(git_dir), 'packed-refs')
+    if os.path.isfile(packed_refs_path):
+        with open(packed_refs_path, 'r') as f:
+            for line in f:
+                # skip the header and the peeled tag lines
+                if line.startswith('#') or line.startswith('^'):
+                    continue
+                parts = line.split()
+                if len(parts) == 2 and parts[1] == ref_name:
+                    return parts[0]
+
+    raise IOError(f"Could not resolve git ref {ref_name} in {git_dir}")
+
+
+def read_git_head(repo_path):
+    """
+    Get the full commit hash of HEAD without spawning git.
+    Args:
+        repo_path (str): the root folder of the repo.
+    Returns:
+        str: the 40 characters commit hash.
+    """
+    git_dir = get_git_dir(repo_path)
+    ref_name, commit_hash = read_symbolic_head(git_dir)
+    if ref_name is not None:
+        commit_hash = resolve_ref(git_dir, ref_name)
+    return commit_hash
+
+
+def write_if_changed(file_path, content):
+    """
+    Write a generated file only when its content differs from what is on disk,
+    keeping the timestamp untouched so make does not rebuild its dependents.
+    Args:
+        file_path (str): the generated file path.
+        content (str): the rendered content.
+    Returns:
+        bool: True if the file was written, False if it was already up to date.
+    """
+    try:
+        with open(file_path, 'r') as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+
+    # write next to the target and swap so a failed write never leaves a half header
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(content)
+    os.replace(tmp_path, file_path)
+    return True
+
+
+def render_header(defines, pragma_once=True):
+    """
+    Render a C header from a list of (name, value) pairs.
+    """
+    lines = ['#pragma once'] if pragma_once else []
+    for name, value in defines:
+        lines.append(f'#define {name} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_header(file_path, defines, pragma_once=True):
+    """
+    Render a header and write it only if it changed.
+    Returns:
+        bool: True if the header was written.
+    """
+    return write_if_changed(file_path, render_header(defines, pragma_once))
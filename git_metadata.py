@@ -0,0 +1,106 @@
+'''
+@file git_metadata.py
+@brief: Memoized git metadata on top of GitObj.
+
+The commit hash and current branch are read from the .git directory without
+spawning git. The remote url and author come from a single
+`git config --list -z` call, so git itself resolves the quoting, comments,
+includes and the system/global/local precedence. Every value is cached
+until a mutating operation (commit, tag, reset, checkout, push) goes through
+this object, which clears the cache. Anything else is forwarded to the
+wrapped GitObj, timed as subprocess time when a profiler is given.
+'''
+import subprocess
+
+from phase_profile import NullProfiler
+from generated_header import get_git_dir, read_symbolic_head, resolve_ref
+
+BRANCH_REF_PREFIX = 'refs/heads/'
+
+MUTATING_OPERATIONS = ('commit', 'tag', 'tag_delete', 'tag_push', 'push', 'reset_hard', 'checkout')
+
+
+def read_git_config(repo_path):
+    """
+    Read the effective git config of a repo.
+    Returns:
+        dict: key -> value, keys like 'remote.origin.url', the last value
+              wins for keys set several times. Empty if git fails.
+    """
+    try:
+        output = subprocess.check_output(['git', 'config', '--list', '-z'], cwd=repo_path, stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        return {}
+
+    config = {}
+    # -z: entries end with NUL, the key ends at the first newline
+    for entry in output.decode('utf-8', errors='replace').split('\0'):
+        if entry:
+            key, _, value = entry.partition('\n')
+            config[key] = value
+    return config
+
+
+class GitMetadata:
+    def __init__(self, git_obj, repo_path, profiler=None):
+        self.git = git_obj
+        self.repo_path = str(repo_path)
+        self.git_dir = get_git_dir(self.repo_path)
+        self.profiler = profiler if profiler is not None else NullProfiler()
+        self._cache = {}
+
+    def invalidate(self):
+        self._cache.clear()
+
+    def _cached(self, key, getter):
+        if key not in self._cache:
+            self._cache[key] = getter()
+        return self._cache[key]
+
+    def _head(self):
+        ref_name, commit_hash = read_symbolic_head(self.git_dir)
+        if ref_name is not None:
+            commit_hash = resolve_ref(self.git_dir, ref_name)
+        return ref_name, commit_hash
+
+    def _config(self):
+        return self.profiler.track_subprocess(read_git_config)(self.repo_path)
+
+    def get_commit_hash(self):
+        return self._cached('head', self._head)[1]
+
+    @property
+    def curr_branch(self):
+        ref_name = self._cached('head', self._head)[0]
+        if ref_name is None:
+            # detached HEAD, let GitObj decide how to name it
+            return self.git.curr_branch
+        return ref_name[len(BRANCH_REF_PREFIX):] if ref_name.startswith(BRANCH_REF_PREFIX) else ref_name
+
+    def get_remote_url(self, remote='origin'):
+        def getter():
+            url = self._cached('config', self._config).get(f'remote.{remote}.url')
+            return url if url is not None else self.profiler.track_subprocess(self.git.get_remote_url)()
+        return self._cached(('remote_url', remote), getter)
+
+    def get_author(self):
+        def getter():
+            author = self._cached('config', self._config).get('user.name')
+            return author if author is not None else self.profiler.track_subprocess(self.git.get_author)()
+        return self._cached('author', getter)
+
+    def __getattr__(self, name):
+        attr = getattr(self.git, name)
+        if not callable(attr):
+            return attr
+
+        # every GitObj operation runs git
+        operation = self.profiler.track_subprocess(attr)
+        if name in MUTATING_OPERATIONS:
+            def mutating_operation(*args, **kwargs):
+                try:
+                    return operation(*args, **kwargs)
+                finally:
+                    self.invalidate()
+            return mutating_operation
+        return operation
@@ -0,0 +1,188 @@
+'''
+@file header_defines.py
+@brief: Evaluate the #define constants of a C header in-process.
+
+Replaces the h2py round trip (write a .py next to the header, import it,
+delete it). The conversion follows h2py: comments, integer suffixes and
+casts are stripped, function like macros become lambdas and the value of
+every #define that evaluates is kept, the others are skipped.
+Results are cached by the sha1 of the header and of all the headers it
+includes, directly or not. Like h2py, a header already being processed is
+not included again, so headers including each other do not recurse forever.
+'''
+import os
+import re
+import hashlib
+
+CURRENT_LIMIT_TEMPERATURE_BANDS = (
+    'OVER85C',
+    '40C_85C',
+    '23C_40C',
+    '0C_23C',
+    'NEGATIVE20C_0C',
+    'NEGATIVE30C_NEGATIVE20C',
+    'NEGATIVE40C_NEGATIVE30C',
+    'UNDER_NEGATIVE40C',
+)
+
+CURRENT_LIMIT_MODES = ('LOW', 'MID', 'HIGH', 'DEF', 'BOOST')
+
+DEFINE_RE   = re.compile(r'^[\t ]*#[\t ]*define[\t ]+([a-zA-Z_][a-zA-Z0-9_]*)(\([\w\t ,]*\))?[\t ]*(.*)$')
+INCLUDE_RE  = re.compile(r'^[\t ]*#[\t ]*include[\t ]+"([^"]+)"')
+COMMENT_RE  = re.compile(r'/\*.*?\*/|//[^\n]*', re.DOTALL)
+INT_SUFFIX_RE   = re.compile(r'\b(0[xX][0-9a-fA-F]+|\d+)[uUlL]+\b')
+FLOAT_SUFFIX_RE = re.compile(r'\b(\d+\.\d*(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?)[fF]\b')
+CAST_RE     = re.compile(r'\(\s*(?:const\s+)?(?:unsigned\s+|signed\s+)?'
+                         r'(?:u?int(?:8|16|32|64)_t|char|short|int|long|float|double|bool)\s*\)')
+CHAR_RE     = re.compile(r"'(\\.[^\\]*|[^\\])'")
+
+_defines_cache = {}
+
+
+def c_to_python(expression):
+    """
+    Convert a C constant expression to python.
+    """
+    expression = INT_SUFFIX_RE.sub(r'\1', expression)
+    expression = FLOAT_SUFFIX_RE.sub(r'\1', expression)
+    expression = CAST_RE.sub('', expression)
+    expression = CHAR_RE.sub(r"ord('\1')", expression)
+    expression = expression.replace('&&', ' and ').replace('||', ' or ')
+    expression = re.sub(r'!(?!=)', ' not ', expression)
+    return expression.strip()
+
+
+def _evaluate(text, header_dir, env, names, dependencies, visited):
+    """
+    Args:
+        dependencies (dict): filled with path -> sha1 of every header included,
+                             directly or through another include.
+    Returns:
+        set: includes skipped because they were already being processed,
+             the result then depends on the header including this one.
+    """
+    skipped = set()
+    # Join the continuation lines, remove comments
+    text = text.replace('\r\n', '\n')
+    text = COMMENT_RE.sub(' ', text.replace('\\\n', ' '))
+
+    for line in text.splitlines():
+        match = INCLUDE_RE.match(line)
+        if match:
+            include_path = os.path.join(header_dir, match.group(1))
+            if not os.path.isfile(include_path):
+                continue
+            if os.path.abspath(include_path) in visited:
+                skipped.add(os.path.abspath(include_path))
+                continue
+            defines, include_skipped, include_dependencies = _get_defines(include_path, visited)
+            skipped |= include_skipped
+            dependencies.update(include_dependencies)
+            for name, value in defines.items():
+                env[name] = value
+                names.append(name)
+            continue
+
+        match = DEFINE_RE.match(line)
+        if not match:
+            continue
+
+        name, args, body = match.groups()
+        body = c_to_python(body)
+        if args is not None:
+            body = f"lambda {args.strip('()')}: ({body or 'None'})"
+        elif not body:
+            # flag like #define FEATURE
+            body = '1'
+
+        try:
+            env[name] = eval(body, env)
+            names.append(name)
+        except Exception:
+            # same as h2py, anything that is not a constant expression is skipped
+            continue
+
+    return skipped
+
+
+def get_defines(header_path):
+    """
+    Get the #define constants of a header.
+    Args:
+        header_path (str): path to the .h file.
+    Returns:
+        dict: name -> value, only numbers and strings are returned.
+    """
+    # copy so callers cannot alter the cached values
+    return dict(_get_defines(header_path, set())[0])
+
+
+def _get_defines(header_path, visited):
+    """
+    Args:
+        visited (set): absolute paths of the headers being processed.
+    Returns:
+        tuple: (defines, skipped includes, dependencies), the dependencies
+               are the path -> sha1 of the header and of all its includes.
+    """
+    with open(header_path, 'rb') as f:
+        content = f.read()
+
+    key = (os.path.abspath(header_path), hashlib.sha1(content).hexdigest())
+    cached = _defines_cache.get(key)
+    # an include that changed, even several levels down, invalidates the header
+    if cached is not None and all(_file_hash(path) == digest for path, digest in cached[1].items()):
+        return cached[0], set(), {key[0]: key[1], **cached[1]}
+
+    env = {'__builtins__': {}, 'ord': ord}
+    names = []
+    dependencies = {}
+    visited.add(key[0])
+    try:
+        skipped = _evaluate(content.decode('utf-8', errors='replace'), os.path.dirname(header_path),
+                             env, names, dependencies, visited)
+    finally:
+        visited.discard(key[0])
+    defines = {name: env[name] for name in names if isinstance(env[name], (int, float, str))}
+
+    # a header evaluated inside an include cycle misses the defines of the
+    # headers that included it, its result is only cached once the cycle is
+    # closed by the header itself
+    skipped.discard(key[0])
+    dependencies.pop(key[0], None)
+    if not skipped:
+        _defines_cache[key] = (defines, dependencies)
+    return defines, skipped, {key[0]: key[1], **dependencies}
+
+
+def _file_hash(file_path):
+    try:
+        with open(file_path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def get_current_limits(header_path):
+    """
+    Get the current limits of current_limit.h as a table.
+    Returns:
+        dict: mode -> {temperature band -> limit in mA}, in the order of
+              CURRENT_LIMIT_MODES and CURRENT_LIMIT_TEMPERATURE_BANDS.
+    Raises:
+        IOError: if a limit is not defined.
+    """
+    defines = get_defines(header_path)
+    limits = {}
+    for mode in CURRENT_LIMIT_MODES:
+        limits[mode] = {}
+        for band in CURRENT_LIMIT_TEMPERATURE_BANDS:
+            name = current_limit_name(band, mode)
+            if name not in defines:
+                raise IOError(f"{name} is not defined in {header_path}")
+            limits[mode][band] = defines[name]
+    return limits
+
+
+def current_limit_name(band, mode):
+    return f'CURRENT_LIMIT_MA_{band}_{mode}_MODE'
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+
+'''
+@file lin_decoder.py
+@brief: Decode raw LIN bus traffic captured from the serial tooling.
+
+The capture is the raw UART byte stream of the bus: a break shows up as a
+0x00 byte (framing error) followed by the 0x55 sync byte, then the PID,
+up to 8 data bytes and the checksum. Every step is done on whole NumPy
+arrays, the frames are returned as a structured array with FRAME_DTYPE.
+
+Usage: python lin_decoder.py <capturefile> [--baudrate 19200] [--checksum auto]
+'''
+import os
+import sys
+from argparse import ArgumentParser, RawTextHelpFormatter
+
+import numpy as np
+
+from fid_2_pid import pids_2_fids, INVALID_FID
+
+BREAK_BYTE = 0x00
+SYNC_BYTE  = 0x55
+
+MAX_DATA_LENGTH = 8
+# break + sync + pid
+HEADER_LENGTH = 3
+
+# Diagnostic frames always use the classic checksum
+DIAG_FIDS = (0x3C, 0x3D)
+
+# Bit times per byte on the wire: start + 8 data + stop + 1 inter byte space
+BITS_PER_BYTE = 11
+
+DEFAULT_BAUDRATE = 19200
+DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024
+
+CHECKSUM_NONE     = 0
+CHECKSUM_CLASSIC  = 1
+CHECKSUM_ENHANCED = 2
+
+CHECKSUM_MODELS = ('auto', 'classic', 'enhanced')
+
+FRAME_DTYPE = np.dtype([
+    ('timestamp',      'f8'),
+    ('offset',         'i8'),
+    ('pid',            'u1'),
+    ('fid',            'i1'),
+    ('pid_valid',      '?'),
+    ('length',         'u1'),
+    ('length_valid',   '?'),
+    ('data',           'u1', (MAX_DATA_LENGTH,)),
+    ('checksum',       'u1'),
+    ('checksum_valid', '?'),
+    ('checksum_type',  'u1'),
+])
+
+STATS_DTYPE = np.dtype([
+    ('fid',             'u1'),
+    ('frames',          'i8'),
+    ('no_response',     'i8'),
+    ('length_errors',   'i8'),
+    ('checksum_errors', 'i8'),
+])
+
+
+def find_breaks(buf, frame_lengths=None):
+    """
+    Find the offsets of the break/sync pairs in a capture.
+    Args:
+        buf (np.ndarray): uint8 capture.
+        frame_lengths (array like): optional data length per FID (64 entries),
+            when given, break/sync pairs found inside the data of a previous
+            frame are dropped.
+    Returns:
+        np.ndarray: int64 offsets of the break bytes.
+    """
+    if len(buf) < 2:
+        return np.empty(0, dtype=np.int64)
+
+    breaks = np.flatnonzero((buf[:-1] == BREAK_BYTE) & (buf[1:] == SYNC_BYTE)).astype(np.int64)
+    if frame_lengths is None or len(breaks) == 0:
+        return breaks
+
+    frame_lengths = np.asarray(frame_lengths, dtype=np.int64)
+    while True:
+        pid_offsets = np.minimum(breaks + 2, len(buf) - 1)
+        fids = pids_2_fids(buf[pid_offsets]).astype(np.int64)
+        # unknown PIDs cannot be trusted to tell the frame length
+        lengths = np.where(fids == INVALID_FID, 0, frame_lengths[fids & 0x3f] + 1)
+        ends = breaks + HEADER_LENGTH + lengths
+        # a break is kept when it starts after the end of the previous one
+        keep = np.ones(len(breaks), dtype=bool)
+        keep[1:] = breaks[1:] >= ends[:-1]
+        if keep.all():
+            return breaks
+        # drop only the first overlapping break of each run, the next pass
+        # re-evaluates the others against the frames that were kept
+        drop = ~keep
+        drop[1:] &= keep[:-1]
+        breaks = breaks[~drop]
+
+
+def checksums(pids, data, enhanced):
+    """
+    Compute LIN checksums for many frames at once.
+    Args:
+        pids (np.ndarray): uint8 PIDs.
+        data (np.ndarray): (n, 8) uint8 data, bytes past the length must be 0.
+        enhanced (bool or np.ndarray): include the PID in the sum.
+    Returns:
+        np.ndarray: uint8 checksums.
+    """
+    total = data.sum(axis=1, dtype=np.int64)
+    total = total + np.where(enhanced, pids.astype(np.int64), 0)
+    # sum with carry: 9 bytes max fit in 12 bits, two folds are enough
+    total = (total & 0xff) + (total >> 8)
+    total = (total & 0xff) + (total >> 8)
+    return (0xff - total).astype(np.uint8)
+
+
+def decode_frames(buf, base_offset=0, baudrate=DEFAULT_BAUDRATE, byte_times=None,
+                  checksum='auto', frame_lengths=None, breaks=None):
+    """
+    Decode all the frames of a capture held in memory.
+    Args:
+        buf (bytes or np.ndarray): raw capture.
+        base_offset (int): offset of buf in the whole capture.
+        baudrate (int): bus speed, used to derive the timestamps from the offsets.
+        byte_times (np.ndarray): optional reception time of every byte of buf,
+            used instead of the baudrate.
+        checksum (str): 'auto', 'classic' or 'enhanced'.
+        frame_lengths (array like): optional data length per FID, see find_breaks().
+        breaks (np.ndarray): already known break offsets in buf.
+    Returns:
+        np.ndarray: the frames with FRAME_DTYPE.
+    """
+    if checksum not in CHECKSUM_MODELS:
+        raise ValueError(f"Unknown checksum model {checksum}, use one of {CHECKSUM_MODELS}")
+
+    buf = np.frombuffer(buf, dtype=np.uint8) if not isinstance(buf, np.ndarray) else buf
+    if breaks is None:
+        breaks = find_breaks(buf, frame_lengths)
+
+    # Drop a trailing break without a PID
+    breaks = breaks[breaks + HEADER_LENGTH <= len(buf)]
+
+    frames = np.zeros(len(breaks), dtype=FRAME_DTYPE)
+    if len(breaks) == 0:
+        return frames
+
+    ends = np.empty_like(breaks)
+    ends[:-1] = breaks[1:]
+    ends[-1] = len(buf)
+
+    pids = buf[breaks + 2]
+    fids = pids_2_fids(pids)
+
+    # everything after the PID is data + checksum, an empty response means no slave answered
+    response_lengths = ends - breaks - HEADER_LENGTH
+    if frame_lengths is not None:
+        expected = np.asarray(frame_lengths, dtype=np.int64)[fids & 0x3f] + 1
+        response_lengths = np.where(fids == INVALID_FID, response_lengths,
+                                    np.minimum(response_lengths, expected))
+    lengths = np.clip(response_lengths - 1, 0, MAX_DATA_LENGTH)
+
+    data_start = breaks + HEADER_LENGTH
+    columns = np.arange(MAX_DATA_LENGTH)
+    data_mask = columns[None, :] < lengths[:, None]
+    data_index = np.minimum(data_start[:, None] + columns[None, :], len(buf) - 1)
+    data = np.where(data_mask, buf[data_index], 0).astype(np.uint8)
+
+    has_response = response_lengths >= 2
+    received_checksum = buf[np.minimum(data_start + lengths, len(buf) - 1)]
+    received_checksum = np.where(has_response, received_checksum, 0).astype(np.uint8)
+
+    classic_ok = checksums(pids, data, False) == received_checksum
+    enhanced_ok = checksums(pids, data, True) == received_checksum
+    is_diag = np.isin(fids, DIAG_FIDS)
+
+    if checksum == 'classic':
+        enhanced_ok[:] = False
+    elif checksum == 'enhanced':
+        classic_ok &= is_diag
+        enhanced_ok &= ~is_diag
+    else:
+        enhanced_ok &= ~is_diag
+
+    checksum_type = np.where(enhanced_ok, CHECKSUM_ENHANCED,
+                             np.where(classic_ok, CHECKSUM_CLASSIC, CHECKSUM_NONE))
+
+    if byte_times is not None:
+        frames['timestamp'] = np.asarray(byte_times)[breaks]
+    else:
+        frames['timestamp'] = (base_offset + breaks) * BITS_PER_BYTE / baudrate
+
+    frames['offset'] = base_offset + breaks
+    frames['pid'] = pids
+    frames['fid'] = fids
+    frames['pid_valid'] = fids != INVALID_FID
+    frames['length'] = lengths
+    frames['length_valid'] = response_lengths <= MAX_DATA_LENGTH + 1
+    frames['data'] = data
+    frames['checksum'] = received_checksum
+    frames['checksum_valid'] = has_response & (classic_ok | enhanced_ok) & (fids != INVALID_FID)
+    frames['checksum_type'] = np.where(has_response, checksum_type, CHECKSUM_NONE)
+
+    return frames
+
+
+def decode_file(file_path, chunk_size=DEFAULT_CHUNK_SIZE, **kwargs):
+    """
+    Decode a capture file chunk by chunk, the file is memory mapped so only
+    the chunk being decoded is read.
+    Args:
+        file_path (str): the capture file.
+        chunk_size (int): number of bytes decoded at once.
+        kwargs: passed to decode_frames(), except byte_times.
+    Returns:
+        np.ndarray: the frames with FRAME_DTYPE.
+    """
+    if os.path.getsize(file_path) == 0:
+        return np.zeros(0, dtype=FRAME_DTYPE)
+
+    capture = np.memmap(file_path, dtype=np.uint8, mode='r')
+    results = []
+    start = 0
+    while start < len(capture):
+        stop = min(start + chunk_size, len(capture))
+        buf = np.asarray(capture[start:stop])
+        breaks = find_breaks(buf, kwargs.get('frame_lengths'))
+
+        if stop < len(capture):
+            if len(breaks) == 0 or breaks[-1] == 0:
+                # no frame ends in this chunk, keep the last byte as it may be a break
+                start = max(stop - 1, start + 1)
+                continue
+            # the last frame may continue in the next chunk, decode it there
+            results.append(decode_frames(buf[:breaks[-1]], base_offset=start, breaks=breaks[:-1], **kwargs))
+            start = start + int(breaks[-1])
+        else:
+            results.append(decode_frames(buf, base_offset=start, breaks=breaks, **kwargs))
+            start = stop
+
+    return np.concatenate(results) if results else np.zeros(0, dtype=FRAME_DTYPE)
+
+
+def frame_statistics(frames):
+    """
+    Count the frames and errors per frame id.
+    Args:
+        frames (np.ndarray): frames with FRAME_DTYPE.
+    Returns:
+        (np.ndarray, int): per FID statistics with STATS_DTYPE (64 entries)
+                           and the number of frames with a PID parity error.
+    """
+    valid = frames[frames['pid_valid']]
+    fids = valid['fid'].astype(np.int64)
+    no_response = valid['length'] == 0
+    length_errors = ~valid['length_valid']
+
+    stats = np.zeros(64, dtype=STATS_DTYPE)
+    stats['fid'] = np.arange(64)
+    stats['frames'] = np.bincount(fids, minlength=64)
+    stats['no_response'] = np.bincount(fids, weights=no_response, minlength=64)
+    stats['length_errors'] = np.bincount(fids, weights=length_errors, minlength=64)
+    stats['checksum_errors'] = np.bincount(fids, weights=~valid['checksum_valid'] & ~no_response, minlength=64)
+
+    pid_errors = int(np.count_nonzero(~frames['pid_valid']))
+    return stats, pid_errors
+
+
+def print_statistics(frames):
+    stats, pid_errors = frame_statistics(frames)
+    print(f"Frames: {len(frames)}, PID parity errors: {pid_errors}\n")
+    print(f"{'FID':>5} {'Frames':>10} {'No resp.':>10} {'Checksum':>10} {'Length':>10}")
+    for row in stats[stats['frames'] > 0]:
+        print(f" 0x{row['fid']:02X} {row['frames']:>10} {row['no_response']:>10} "
+              f"{row['checksum_errors']:>10} {row['length_errors']:>10}")
+
+
+def parse_args():
+    """Parse command line arguments"""
+    pars = ArgumentParser(formatter_class=RawTextHelpFormatter, description=__doc__)
+
+    pars.add_argument('capture', help='raw LIN capture file')
+
+    pars.add_argument(
+        '-b', '--baudrate',
+        help='bus speed, used to compute the timestamps',
+        type=int,
+        default=DEFAULT_BAUDRATE)
+
+    pars.add_argument(
+        '-c', '--checksum',
+        help='checksum model',
+        choices=CHECKSUM_MODELS,
+        default='auto')
+
+    pars.add_argument(
+        '-o', '--output',
+        help='save the decoded frames to a .npy file',
+        type=str,
+        default=None)
+
+    return pars.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if not os.path.isfile(args.capture):
+        print(f"Error: File '{args.capture}' not found.")
+        sys.exit(1)
+
+    frames = decode_file(args.capture, baudrate=args.baudrate, checksum=args.checksum)
+    print_statistics(frames)
+
+    if args.output:
+        np.save(args.output, frames)
+        print(f"\nFrames saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
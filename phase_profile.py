@@ -0,0 +1,122 @@
+'''
+@file phase_profile.py
+@brief: Named timing spans for the release pipeline.
+
+Each phase records its wall time, the time spent waiting on subprocesses and
+the number of bytes copied. Subprocess time is summed over threads, so a
+phase running tasks concurrently can report more subprocess time than wall
+time. Phases can be nested, the summary indents them by depth.
+'''
+import json
+import time
+import threading
+import datetime
+from contextlib import contextmanager
+from functools import wraps
+
+
+class PhaseProfiler:
+    def __init__(self):
+        self.phases = []
+        self._stack = []
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self.started_at = datetime.datetime.now().isoformat(timespec='seconds')
+
+    @contextmanager
+    def phase(self, name):
+        record = {
+            'name': name,
+            'depth': len(self._stack),
+            'wall_s': 0.0,
+            'subprocess_s': 0.0,
+            'bytes_copied': 0,
+            'failed': False,
+        }
+        self.phases.append(record)
+        self._stack.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException:
+            record['failed'] = True
+            raise
+        finally:
+            record['wall_s'] = time.perf_counter() - start
+            self._stack.pop()
+
+    @contextmanager
+    def subprocess(self):
+        """
+        Count the time spent in the block as subprocess time of the current phase.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add('subprocess_s', time.perf_counter() - start)
+
+    def track_subprocess(self, func):
+        """
+        Wrap a function so its whole duration counts as subprocess time.
+        """
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.subprocess():
+                return func(*args, **kwargs)
+        return wrapper
+
+    def add_bytes(self, count):
+        self._add('bytes_copied', count)
+
+    def _add(self, key, value):
+        with self._lock:
+            if self._stack:
+                self._stack[-1][key] += value
+
+    def total_wall_time(self):
+        return time.perf_counter() - self._start
+
+    def summary_table(self):
+        lines = [f"{'Phase':<32} {'Wall (s)':>10} {'Subproc (s)':>12} {'Bytes copied':>14}"]
+        lines.append('-' * len(lines[0]))
+        for record in self.phases:
+            name = '  ' * record['depth'] + record['name'] + (' (failed)' if record['failed'] else '')
+            lines.append(f"{name:<32} {record['wall_s']:>10.2f} {record['subprocess_s']:>12.2f} {record['bytes_copied']:>14}")
+        lines.append('-' * len(lines[0]))
+        lines.append(f"{'Total':<32} {self.total_wall_time():>10.2f}")
+        return '\n'.join(lines)
+
+    def print_summary(self):
+        print('\n' + self.summary_table() + '\n')
+
+    def to_dict(self):
+        return {
+            'started_at': self.started_at,
+            'total_wall_s': round(self.total_wall_time(), 3),
+            'phases': [dict(record, wall_s=round(record['wall_s'], 3), subprocess_s=round(record['subprocess_s'], 3))
+                       for record in self.phases],
+        }
+
+    def write_json(self, file_path):
+        with open(file_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=4)
+
+
+class NullProfiler:
+    """
+    Profiler doing nothing, used when no profiling is requested.
+    """
+    @contextmanager
+    def phase(self, name):
+        yield None
+
+    @contextmanager
+    def subprocess(self):
+        yield
+
+    def track_subprocess(self, func):
+        return func
+
+    def add_bytes(self, count):
+        pass
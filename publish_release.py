@@ -18,15 +18,28 @@ TODO:
 '''
 import re
 import os
-import sys
+import json
+import copy
+import functools
 import pathlib
 import shutil
 import datetime 
+import tempfile
+import threading
+import time
 from argparse import ArgumentParser, RawTextHelpFormatter
-from gitobj import GitObj
+from git_metadata import GitMetadata
+from phase_profile import PhaseProfiler
 import subprocess
-from check_compiler_version import get_compiler_version
 from rename import get_full_filename, h2py_get_filename, get_file_path
+from artifact_store import add_files, write_manifest, file_sha256
+from build_analyzer import analyze_stream, print_report
+from variant_builds import create_worktrees, remove_worktrees, build_variants
+from release_catalog import record_release
+from elf_sizes import read_section_sizes, append_history
+from build_cache import get_cache_dir, compute_fingerprint, list_build_outputs, restore_build, store_build
+from generated_header import read_git_head
+from header_defines import get_defines, get_current_limits, current_limit_name, CURRENT_LIMIT_TEMPERATURE_BANDS
 
 def get_root_path():
     """
@@ -34,23 +47,32 @@ def get_root_path():
     """
     return pathlib.Path(os.path.realpath(__file__)).parents[1]
 
-sys.path.append(str(get_root_path() / 'scripts'))
-from h2py import h2py
+def in_tree(path, root=None):
+    """
+    Map a path of the repo to the same path in another worktree root.
+    """
+    path = os.path.join(get_root_path(), path)
+    if root is None:
+        return path
+    return os.path.join(root, os.path.relpath(path, get_root_path()))
 
-SRC_DIR = str(get_root_path() / 'code' / 'src')
 
 NVRAM_CLEAR_FILENMAE = '8133x_eeprom_cust_cleared.hex'
-SYSTEM_SETTING_PY_PATH = str(get_root_path() / 'code' / 'src' / 'system_settings.py')
 SYSTEM_SETTING_PATH = str(get_root_path() / 'code' / 'src' / 'system_settings.h')
 SYSTEM_SETTING_BACKUP_PATH = str(get_root_path() / 'code' / 'src' / 'system_settings_backup.h')
 
 CURRENT_LIMIT_PATH = str(get_root_path() / 'code' / 'src' / 'current_limit.h')
-CURRENT_LIMIT_PY_PATH = str(get_root_path() / 'code' / 'src' / 'current_limit.py')
 
 GIT_COMMIT_MSG_PATH = str(get_root_path() / 'code' / 'src' / '.gitcommitmsg.txt')
-BUILD_BAT_PATH = str(get_root_path() / 'build.bat')
+BUILD_COMMAND = 'build.bat'
+BUILD_BAT_PATH = str(get_root_path() / BUILD_COMMAND)
 RELEASES_DIR_PATH = get_root_path() / 'release'
+ARTIFACT_STORE_PATH = RELEASES_DIR_PATH / '.store'
+SIZE_HISTORY_PATH = RELEASES_DIR_PATH / 'size_history.csv'
+CATALOG_PATH = RELEASES_DIR_PATH / 'catalog.sqlite'
+BUILD_OUTPUT_DIR = str(get_root_path() / 'code')
 MAKEFILE_CONF_PATH = str(get_root_path() / 'code' / 'src' / 'Makefile.configure.mk')
+MAKEFILE_CONF_RELATIVE_PATH = 'code/src/Makefile.configure.mk'
 NVRAM_CLEAR_FILE_PATH = str(get_root_path() / 'code' / 'src' / NVRAM_CLEAR_FILENMAE)
 
 SYSTEM_SETTING_RELATIVE_PATH = 'code/src/system_settings.h'
@@ -69,6 +91,9 @@ WEEK_RE_PATTERN    = r'(#define SOFTWARE_VERSION_WEEK\s+\()(.*)(\)\s*)'
 LEVEL_RE_PATTERN   = r'(#define SOFTWARE_VERSION_LEVEL\s+\()(.*)(\)\s*)'
 VARIANT_RE_PATTERN = r'(#define SOFTWARE_VERSION_VARIANT\s+\()(.*)(\)\s*)'
 
+# Changed at every release, left out of the build cache fingerprint
+VERSION_RE_PATTERNS = (YEAR_RE_PATTERN, WEEK_RE_PATTERN, LEVEL_RE_PATTERN, VARIANT_RE_PATTERN)
+
 HELP_TEXT ="""
 Script to update the version in system_settings.h
 Example
@@ -78,6 +103,42 @@ python update_version.py
 LEVEL_NON_VALIDATED = 0x00
 LEVEL_VALIDATED     = 0x01
 
+DEFAULT_CHIP_NAME = 'MLX_81332'
+
+# Flash and RAM sizes in kB per chip, a chip missing here cannot be released
+CHIP_MEMORY_SIZES = {
+    'MLX_81332': (32, 2),
+    'MLX_81334': (64, 4),
+}
+
+# Release note title of each current limit mode
+CURRENT_LIMIT_MODE_TITLES = (
+    ('LOW',   'LOW SPEED'),
+    ('MID',   'MID SPEED'),
+    ('HIGH',  'HIGH SPEED'),
+    ('DEF',   'DEFAULT SPEED'),
+    ('BOOST', 'BOOST MODE'),
+)
+
+PROFILE_FILENAME = 'release_profile.json'
+BUILD_REPORT_FILENAME = 'build_report.json'
+
+# Timing of the release phases, printed at the end and saved in the release folder
+PROFILER = PhaseProfiler()
+
+# build_analyzer reports of the builds run by this release, per variant (None without variants)
+BUILD_REPORTS = {}
+
+# Full build output of each variant build, copied into its release folder
+BUILD_LOGS = {}
+
+# Maximum time in seconds given to each release data gathering task
+DATA_GATHERING_TIMEOUT = 120
+
+# Restored objects are dated this many seconds before the version bump, more
+# than the mtime resolution of any file system (FAT: 2 s)
+BUILD_CACHE_MTIME_MARGIN = 3
+
 class ReleaseObj:
     pass
 
@@ -108,20 +169,36 @@ def parse_args():
         help='the branch to checkout to or stay in for applying the changes and tags',
         type=str,
         default=GIT_DEVELOP_BRANCH_NAME)
+
+    pars.add_argument(
+        '-n', '--no-build-cache',
+        help='build without restoring the objects of the build cache',
+        action="store_true",
+        default=False)
+
+    pars.add_argument(
+        '-p', '--variants',
+        help='comma separated PRODUCT values to build and release in parallel, e.g. 81332,81334\n'
+             'each variant is built in its own git worktree',
+        type=str,
+        default=None)
     
     return pars.parse_args()
 
 def build_code():
     try:
-        output = subprocess.Popen(['build.bat'],
-                                cwd=get_root_path(),
-                                stderr=subprocess.STDOUT,
-                                stdout=subprocess.PIPE,
-                                shell=True)
-        for line in output.stdout:
-            print(line.decode().strip())
+        with PROFILER.subprocess():
+            output = subprocess.Popen([BUILD_COMMAND],
+                                    cwd=get_root_path(),
+                                    stderr=subprocess.STDOUT,
+                                    stdout=subprocess.PIPE,
+                                    shell=True)
+            analyzer = analyze_stream(output.stdout)
+
+            ret = output.wait()
 
-        ret = output.wait()
+        BUILD_REPORTS[None] = analyzer.to_dict()
+        print_report(BUILD_REPORTS[None], diagnostics=False)
 
         if ret == 0:
             print("Build success!")
@@ -132,6 +209,51 @@ def build_code():
 
     except subprocess.CalledProcessError as e:
         raise IOError(f"Command failed with return code {e.returncode}, Msg: {e.output.decode()}")
+
+@functools.lru_cache(maxsize=None)
+def get_toolchain_version():
+    """
+    The compiler version, queried once for the build cache and the release note.
+    """
+    from check_compiler_version import get_compiler_version
+
+    return PROFILER.track_subprocess(get_compiler_version)()
+
+def get_build_fingerprint():
+    """
+    Fingerprint of the build inputs without the version: the version defines
+    of system_settings.h (and of its backup made by update_version) are
+    normalised out and internal_version.h is left out, so consecutive
+    releases of the same sources share a fingerprint.
+    """
+    return compute_fingerprint(get_root_path(),
+                               [BUILD_OUTPUT_DIR],
+                               get_toolchain_version(),
+                               extra_files=[MAKEFILE_CONF_PATH, BUILD_BAT_PATH],
+                               normalize={SYSTEM_SETTING_PATH:        VERSION_RE_PATTERNS,
+                                          SYSTEM_SETTING_BACKUP_PATH: VERSION_RE_PATTERNS})
+
+def build_code_cached():
+    """
+    Build the firmware starting from the cached objects of a build of the
+    same sources. The objects are dated just before the version bump of
+    system_settings.h, so build.bat only recompiles the units including the
+    version headers and links again.
+    """
+    cache_dir = get_cache_dir(get_root_path())
+    fingerprint = get_build_fingerprint()
+
+    objects_mtime = os.path.getmtime(SYSTEM_SETTING_PATH) - BUILD_CACHE_MTIME_MARGIN
+    restored = restore_build(cache_dir, fingerprint, str(get_root_path()), objects_mtime)
+    if restored:
+        print(f"Build cache hit {fingerprint[:12]}: {restored} objects restored, "
+              f"only the version dependent units are rebuilt")
+
+    build_code()
+
+    # after a hit only the version dependent objects changed, the entry is still valid
+    if not restored:
+        store_build(cache_dir, fingerprint, str(get_root_path()), list_build_outputs(BUILD_OUTPUT_DIR))
     
 def update_version():
     args = parse_args()
@@ -193,35 +315,41 @@ def update_version():
     
     return f'v{new_level_value}.{new_variant_value:03}'
 
-def get_mlx_memory_size():
-    mem_size = ReleaseObj()
+def get_chip_memory_size(chip_name):
+    """
+    Returns:
+        tuple: (flash, RAM) sizes of the chip in kB.
+    Raises:
+        IOError: if the chip is not in CHIP_MEMORY_SIZES.
+    """
+    if chip_name not in CHIP_MEMORY_SIZES:
+        raise IOError(f"Unknown chip {chip_name}, add its flash and RAM sizes to CHIP_MEMORY_SIZES")
+    return CHIP_MEMORY_SIZES[chip_name]
 
-    mem_size.total_flash = 32 #kB
-    mem_size.total_ram   = 2  #kB
+def get_mlx_memory_size(chip_name=DEFAULT_CHIP_NAME, root=None):
+    mem_size = ReleaseObj()
 
-    try:
-        # git diff stats only to make parsing easy.
-        output = subprocess.check_output(["mlx16-size", "-A", f"{get_full_filename()}.elf"],
-                                            cwd=get_root_path(),
-                                            stderr=subprocess.STDOUT,
-                                            shell=True)
-        output = output.decode("utf-8")
+    mem_size.total_flash, mem_size.total_ram = get_chip_memory_size(chip_name) #kB
 
-    except subprocess.CalledProcessError as e:
-        raise IOError(f"Command failed with return code {e.returncode}, Msg: {e.output.decode()}")
+    # Read the section headers straight from the elf, no need for mlx16-size
+    mem_size.sections = read_section_sizes(in_tree(f"{get_full_filename()}.elf", root))
 
     mem_size.empty_flash = 0
     mem_size.used_ram   = 0
 
-    for line in output.splitlines():
-        if '.flash_fill' in line:
-            mem_size.empty_flash = int(line.split()[1])
-        elif '.dp' in line:
-            mem_size.used_ram = mem_size.used_ram + int(line.split()[1])
-        elif '.data' in line:
-            mem_size.used_ram = mem_size.used_ram + int(line.split()[1])
-        elif '.bss' in line:
-            mem_size.used_ram = mem_size.used_ram + int(line.split()[1])
+    for name, size in mem_size.sections.items():
+        if '.flash_fill' in name:
+            mem_size.empty_flash = size
+        elif '.dp' in name:
+            mem_size.used_ram = mem_size.used_ram + size
+        elif '.data' in name:
+            mem_size.used_ram = mem_size.used_ram + size
+        elif '.bss' in name:
+            mem_size.used_ram = mem_size.used_ram + size
+
+    # Raw byte counts for the size history
+    mem_size.used_flash_bytes = mem_size.total_flash * 1024 - mem_size.empty_flash
+    mem_size.used_ram_bytes = mem_size.used_ram
 
     mem_size.empty_flash = round(mem_size.empty_flash / 1024, 2)
     mem_size.used_flash = round(mem_size.total_flash - mem_size.empty_flash, 2)
@@ -238,100 +366,108 @@ def get_mlx_memory_size():
     return mem_size
 
 def get_system_settings_info():
-    h2py(SYSTEM_SETTING_PATH, SYSTEM_SETTING_PY_PATH, quiet=True)
-    d = {}
-    exec(rf'sys.path.append(r"{SRC_DIR}")')
-    exec('import system_settings', d)
-    os.remove(SYSTEM_SETTING_PY_PATH)
+    ss = get_defines(SYSTEM_SETTING_PATH)
 
     ss_info                  = ReleaseObj()
-    ss_info.hw_number        = f'{d["system_settings"].HARDWARE_VERSION_NUMBER}'
-    ss_info.hw_sample_status = f'{d["system_settings"].HARDWARE_SAMPLE_STATUS}'
-    ss_info.ov_set           = f'{d["system_settings"].VOLTAGE_HIGH_SET}'
-    ss_info.ov_clear         = f'{d["system_settings"].VOLTAGE_HIGH_CLR}'
-    ss_info.uv_set           = f'{d["system_settings"].VOLTAGE_LOW_SET}'
-    ss_info.uv_clear         = f'{d["system_settings"].VOLTAGE_LOW_CLR}'
-    ss_info.ot_set           = f'{d["system_settings"].TEMPERATURE_HIGH_SET}'
-    ss_info.ot_clear         = f'{d["system_settings"].TEMPERATURE_HIGH_CLR}'
-    ss_info.gear_ratio       = f'{d["system_settings"].GEAR_RATIO}'
-    ss_info.stall_offset     = f'{d["system_settings"].STALL_OFFSET_ANGLE}'
-    ss_info.nominal_angle    = f'{d["system_settings"].ACTUATOR_MOVEMENT_ANGLE}'
-    ss_info.max_angle        = f'{d["system_settings"].MAX_CALIBMOVE_ANGLE}'
-    ss_info.min_angle        = f'{d["system_settings"].MIN_CALIBMOVE_ANGLE}'
-    ss_info.abused_mode      = d["system_settings"].ABUSED_FUNCTION
-    try:
-        ss_info.open_dir     = d["system_settings"].OPEN_DIRECTION
-    except:
+    ss_info.hw_number        = f'{ss["HARDWARE_VERSION_NUMBER"]}'
+    ss_info.hw_sample_status = f'{ss["HARDWARE_SAMPLE_STATUS"]}'
+    ss_info.ov_set           = f'{ss["VOLTAGE_HIGH_SET"]}'
+    ss_info.ov_clear         = f'{ss["VOLTAGE_HIGH_CLR"]}'
+    ss_info.uv_set           = f'{ss["VOLTAGE_LOW_SET"]}'
+    ss_info.uv_clear         = f'{ss["VOLTAGE_LOW_CLR"]}'
+    ss_info.ot_set           = f'{ss["TEMPERATURE_HIGH_SET"]}'
+    ss_info.ot_clear         = f'{ss["TEMPERATURE_HIGH_CLR"]}'
+    ss_info.gear_ratio       = f'{ss["GEAR_RATIO"]}'
+    ss_info.stall_offset     = f'{ss["STALL_OFFSET_ANGLE"]}'
+    ss_info.nominal_angle    = f'{ss["ACTUATOR_MOVEMENT_ANGLE"]}'
+    ss_info.max_angle        = f'{ss["MAX_CALIBMOVE_ANGLE"]}'
+    ss_info.min_angle        = f'{ss["MIN_CALIBMOVE_ANGLE"]}'
+    ss_info.abused_mode      = ss["ABUSED_FUNCTION"]
+    if "OPEN_DIRECTION" in ss:
+        ss_info.open_dir     = ss["OPEN_DIRECTION"]
+    else:
         print("/!\\Warning: Open direction setting is not defined")
         ss_info.open_dir     = 0
-    try:    
-        ss_info.sleep_mode   = d["system_settings"].SLEEP_MODE_ENABLED
-    except:
+    if "SLEEP_MODE_ENABLED" in ss:
+        ss_info.sleep_mode   = ss["SLEEP_MODE_ENABLED"]
+    else:
         print("/!\\Warning: Sleep mode setting is not defined")
         ss_info.sleep_mode   = 0
-    
 
     return ss_info 
 
 
 def get_current_limit_info():
-    h2py(CURRENT_LIMIT_PATH, CURRENT_LIMIT_PY_PATH, quiet=True)
-    d = {}
-    exec(rf'sys.path.append(r"{SRC_DIR}")')
-    exec('import current_limit', d)
-
-    cl_info                                                    = ReleaseObj()
-
-    cl_info.CURRENT_LIMIT_MA_OVER85C_LOW_MODE                       = f'{d["current_limit"].CURRENT_LIMIT_MA_OVER85C_LOW_MODE}'
-    cl_info.CURRENT_LIMIT_MA_40C_85C_LOW_MODE                       = f'{d["current_limit"].CURRENT_LIMIT_MA_40C_85C_LOW_MODE}'
-    cl_info.CURRENT_LIMIT_MA_23C_40C_LOW_MODE                       = f'{d["current_limit"].CURRENT_LIMIT_MA_23C_40C_LOW_MODE}'
-    cl_info.CURRENT_LIMIT_MA_0C_23C_LOW_MODE                        = f'{d["current_limit"].CURRENT_LIMIT_MA_0C_23C_LOW_MODE}'
-    cl_info.CURRENT_LIMIT_MA_NEGATIVE20C_0C_LOW_MODE                = f'{d["current_limit"].CURRENT_LIMIT_MA_NEGATIVE20C_0C_LOW_MODE}'
-    cl_info.CURRENT_LIMIT_MA_NEGATIVE30C_NEGATIVE20C_LOW_MODE       = f'{d["current_limit"].CURRENT_LIMIT_MA_NEGATIVE30C_NEGATIVE20C_LOW_MODE}'
-    cl_info.CURRENT_LIMIT_MA_NEGATIVE40C_NEGATIVE30C_LOW_MODE       = f'{d["current_limit"].CURRENT_LIMIT_MA_NEGATIVE40C_NEGATIVE30C_LOW_MODE}'
-    cl_info.CURRENT_LIMIT_MA_UNDER_NEGATIVE40C_LOW_MODE             = f'{d["current_limit"].CURRENT_LIMIT_MA_UNDER_NEGATIVE40C_LOW_MODE}'
-    cl_info.CURRENT_LIMIT_MA_OVER85C_MID_MODE                       = f'{d["current_limit"].CURRENT_LIMIT_MA_OVER85C_MID_MODE}'
-    cl_info.CURRENT_LIMIT_MA_40C_85C_MID_MODE                       = f'{d["current_limit"].CURRENT_LIMIT_MA_40C_85C_MID_MODE}'
-    cl_info.CURRENT_LIMIT_MA_23C_40C_MID_MODE                       = f'{d["current_limit"].CURRENT_LIMIT_MA_23C_40C_MID_MODE}'
-    cl_info.CURRENT_LIMIT_MA_0C_23C_MID_MODE                        = f'{d["current_limit"].CURRENT_LIMIT_MA_0C_23C_MID_MODE}'
-    cl_info.CURRENT_LIMIT_MA_NEGATIVE20C_0C_MID_MODE                = f'{d["current_limit"].CURRENT_LIMIT_MA_NEGATIVE20C_0C_MID_MODE}'
-    cl_info.CURRENT_LIMIT_MA_NEGATIVE30C_NEGATIVE20C_MID_MODE       = f'{d["current_limit"].CURRENT_LIMIT_MA_NEGATIVE30C_NEGATIVE20C_MID_MODE}'
-    cl_info.CURRENT_LIMIT_MA_NEGATIVE40C_NEGATIVE30C_MID_MODE       = f'{d["current_limit"].CURRENT_LIMIT_MA_NEGATIVE40C_NEGATIVE30C_MID_MODE}'
-    cl_info.CURRENT_LIMIT_MA_UNDER_NEGATIVE40C_MID_MODE             = f'{d["current_limit"].CURRENT_LIMIT_MA_UNDER_NEGATIVE40C_MID_MODE}'
-    cl_info.CURRENT_LIMIT_MA_OVER85C_HIGH_MODE                      = f'{d["current_limit"].CURRENT_LIMIT_MA_OVER85C_HIGH_MODE}'
-    cl_info.CURRENT_LIMIT_MA_40C_85C_HIGH_MODE                      = f'{d["current_limit"].CURRENT_LIMIT_MA_40C_85C_HIGH_MODE}'
-    cl_info.CURRENT_LIMIT_MA_23C_40C_HIGH_MODE                      = f'{d["current_limit"].CURRENT_LIMIT_MA_23C_40C_HIGH_MODE}'
-    cl_info.CURRENT_LIMIT_MA_0C_23C_HIGH_MODE                       = f'{d["current_limit"].CURRENT_LIMIT_MA_0C_23C_HIGH_MODE}'
-    cl_info.CURRENT_LIMIT_MA_NEGATIVE20C_0C_HIGH_MODE               = f'{d["current_limit"].CURRENT_LIMIT_MA_NEGATIVE20C_0C_HIGH_MODE}'
-    cl_info.CURRENT_LIMIT_MA_NEGATIVE30C_NEGATIVE20C_HIGH_MODE      = f'{d["current_limit"].CURRENT_LIMIT_MA_NEGATIVE30C_NEGATIVE20C_HIGH_MODE}'
-    cl_info.CURRENT_LIMIT_MA_NEGATIVE40C_NEGATIVE30C_HIGH_MODE      = f'{d["current_limit"].CURRENT_LIMIT_MA_NEGATIVE40C_NEGATIVE30C_HIGH_MODE}'
-    cl_info.CURRENT_LIMIT_MA_UNDER_NEGATIVE40C_HIGH_MODE            = f'{d["current_limit"].CURRENT_LIMIT_MA_UNDER_NEGATIVE40C_HIGH_MODE}'
-    cl_info.CURRENT_LIMIT_MA_OVER85C_DEF_MODE                       = f'{d["current_limit"].CURRENT_LIMIT_MA_OVER85C_DEF_MODE}'
-    cl_info.CURRENT_LIMIT_MA_40C_85C_DEF_MODE                       = f'{d["current_limit"].CURRENT_LIMIT_MA_40C_85C_DEF_MODE}'
-    cl_info.CURRENT_LIMIT_MA_23C_40C_DEF_MODE                       = f'{d["current_limit"].CURRENT_LIMIT_MA_23C_40C_DEF_MODE}'
-    cl_info.CURRENT_LIMIT_MA_0C_23C_DEF_MODE                        = f'{d["current_limit"].CURRENT_LIMIT_MA_0C_23C_DEF_MODE}'
-    cl_info.CURRENT_LIMIT_MA_NEGATIVE20C_0C_DEF_MODE                = f'{d["current_limit"].CURRENT_LIMIT_MA_NEGATIVE20C_0C_DEF_MODE}'
-    cl_info.CURRENT_LIMIT_MA_NEGATIVE30C_NEGATIVE20C_DEF_MODE       = f'{d["current_limit"].CURRENT_LIMIT_MA_NEGATIVE30C_NEGATIVE20C_DEF_MODE}'
-    cl_info.CURRENT_LIMIT_MA_NEGATIVE40C_NEGATIVE30C_DEF_MODE       = f'{d["current_limit"].CURRENT_LIMIT_MA_NEGATIVE40C_NEGATIVE30C_DEF_MODE}'
-    cl_info.CURRENT_LIMIT_MA_UNDER_NEGATIVE40C_DEF_MODE             = f'{d["current_limit"].CURRENT_LIMIT_MA_UNDER_NEGATIVE40C_DEF_MODE}'
-
-    cl_info.CURRENT_LIMIT_MA_OVER85C_BOOST_MODE                   = f'{d["current_limit"].CURRENT_LIMIT_MA_OVER85C_BOOST_MODE}'
-    cl_info.CURRENT_LIMIT_MA_40C_85C_BOOST_MODE                   = f'{d["current_limit"].CURRENT_LIMIT_MA_40C_85C_BOOST_MODE}'
-    cl_info.CURRENT_LIMIT_MA_23C_40C_BOOST_MODE                   = f'{d["current_limit"].CURRENT_LIMIT_MA_23C_40C_BOOST_MODE}'
-    cl_info.CURRENT_LIMIT_MA_0C_23C_BOOST_MODE                    = f'{d["current_limit"].CURRENT_LIMIT_MA_0C_23C_BOOST_MODE}'
-    cl_info.CURRENT_LIMIT_MA_NEGATIVE20C_0C_BOOST_MODE            = f'{d["current_limit"].CURRENT_LIMIT_MA_NEGATIVE20C_0C_BOOST_MODE}'
-    cl_info.CURRENT_LIMIT_MA_NEGATIVE30C_NEGATIVE20C_BOOST_MODE   = f'{d["current_limit"].CURRENT_LIMIT_MA_NEGATIVE30C_NEGATIVE20C_BOOST_MODE}'
-    cl_info.CURRENT_LIMIT_MA_NEGATIVE40C_NEGATIVE30C_BOOST_MODE   = f'{d["current_limit"].CURRENT_LIMIT_MA_NEGATIVE40C_NEGATIVE30C_BOOST_MODE}'
-    cl_info.CURRENT_LIMIT_MA_UNDER_NEGATIVE40C_BOOST_MODE         = f'{d["current_limit"].CURRENT_LIMIT_MA_UNDER_NEGATIVE40C_BOOST_MODE}'
-
-    os.remove(CURRENT_LIMIT_PY_PATH)
-
-    return cl_info 
+    """
+    Get the current limits table, mode -> {temperature band -> limit}
+    """
+    return get_current_limits(CURRENT_LIMIT_PATH)
+
+def get_current_limit_txt(cl_info):
+    sections = []
+    for mode, title in CURRENT_LIMIT_MODE_TITLES:
+        lines = [f'## {title}', '']
+        for band in CURRENT_LIMIT_TEMPERATURE_BANDS:
+            lines.append(f'{current_limit_name(band, mode):<53}= {cl_info[mode][band]}')
+        sections.append('\n'.join(lines))
+    return '\n\n'.join(sections)
+
+def gather_release_data(tasks, timeout=DATA_GATHERING_TIMEOUT):
+    """
+    Run independent data gathering tasks concurrently.
+    Args:
+        tasks (dict): name -> callable without arguments.
+        timeout (int): seconds given to each task, they all start together.
+    Returns:
+        ReleaseObj: one attribute per task name holding the task result.
+    Raises:
+        IOError: listing every task that failed or timed out.
+    Notes:
+        The tasks run on daemon threads: a task that timed out is abandoned,
+        not stopped, and cannot keep the script from exiting. A subprocess it
+        started (e.g. the compiler version query) is not killed and may keep
+        running after the script exits, on Windows it is left orphaned.
+        A thread pool would be joined at exit and wait for the hung task.
+    """
+    release_data = ReleaseObj()
+    errors = []
+    results = {}
+
+    def run_task(name, task):
+        try:
+            results[name] = (task(), None)
+        except Exception as e:
+            results[name] = (None, e)
+
+    # The tasks are waiting on subprocesses, threads are enough to overlap them
+    threads = [threading.Thread(target=run_task, args=(name, task), name=f'release data {name}', daemon=True)
+               for name, task in tasks.items()]
+    for thread in threads:
+        thread.start()
+
+    deadline = time.monotonic() + timeout
+    for thread in threads:
+        thread.join(max(0, deadline - time.monotonic()))
+
+    for name in tasks:
+        if name not in results:
+            errors.append(f"{name}: timed out after {timeout}s")
+            continue
+        result, error = results[name]
+        if error is not None:
+            errors.append(f"{name}: {error}")
+        else:
+            setattr(release_data, name, result)
+
+    if errors:
+        raise IOError("Release data gathering failed:\n" + "\n".join(errors))
+
+    return release_data
 
 def get_release_note_txt(release_obj):
-    ss_info = get_system_settings_info()
-    cl_info = get_current_limit_info()
-    mem_size = get_mlx_memory_size()
+    ss_info = release_obj.ss_info
+    cl_info = release_obj.cl_info
+    mem_size = release_obj.mem_size
     release_txt = f'''# Release Note:
     
 ## Release Info:
@@ -395,60 +531,7 @@ APP_DEBUGGING             = {"TRUE" if release_obj.debugging_enabled == 1 else "
 
 # Current limits Info
 
-## LOW SPEED
-
-CURRENT_LIMIT_MA_OVER85C_LOW_MODE                    = {cl_info.CURRENT_LIMIT_MA_OVER85C_LOW_MODE}
-CURRENT_LIMIT_MA_40C_85C_LOW_MODE                    = {cl_info.CURRENT_LIMIT_MA_40C_85C_LOW_MODE}
-CURRENT_LIMIT_MA_23C_40C_LOW_MODE                    = {cl_info.CURRENT_LIMIT_MA_23C_40C_LOW_MODE}
-CURRENT_LIMIT_MA_0C_23C_LOW_MODE                     = {cl_info.CURRENT_LIMIT_MA_0C_23C_LOW_MODE}
-CURRENT_LIMIT_MA_NEGATIVE20C_0C_LOW_MODE             = {cl_info.CURRENT_LIMIT_MA_NEGATIVE20C_0C_LOW_MODE}
-CURRENT_LIMIT_MA_NEGATIVE30C_NEGATIVE20C_LOW_MODE    = {cl_info.CURRENT_LIMIT_MA_NEGATIVE30C_NEGATIVE20C_LOW_MODE}
-CURRENT_LIMIT_MA_NEGATIVE40C_NEGATIVE30C_LOW_MODE    = {cl_info.CURRENT_LIMIT_MA_NEGATIVE40C_NEGATIVE30C_LOW_MODE}
-CURRENT_LIMIT_MA_UNDER_NEGATIVE40C_LOW_MODE          = {cl_info.CURRENT_LIMIT_MA_UNDER_NEGATIVE40C_LOW_MODE}
-
-## MID SPEED
-
-CURRENT_LIMIT_MA_OVER85C_MID_MODE                    = {cl_info.CURRENT_LIMIT_MA_OVER85C_MID_MODE}
-CURRENT_LIMIT_MA_40C_85C_MID_MODE                    = {cl_info.CURRENT_LIMIT_MA_40C_85C_MID_MODE}
-CURRENT_LIMIT_MA_23C_40C_MID_MODE                    = {cl_info.CURRENT_LIMIT_MA_23C_40C_MID_MODE}
-CURRENT_LIMIT_MA_0C_23C_MID_MODE                     = {cl_info.CURRENT_LIMIT_MA_0C_23C_MID_MODE}
-CURRENT_LIMIT_MA_NEGATIVE20C_0C_MID_MODE             = {cl_info.CURRENT_LIMIT_MA_NEGATIVE20C_0C_MID_MODE}
-CURRENT_LIMIT_MA_NEGATIVE30C_NEGATIVE20C_MID_MODE    = {cl_info.CURRENT_LIMIT_MA_NEGATIVE30C_NEGATIVE20C_MID_MODE}
-CURRENT_LIMIT_MA_NEGATIVE40C_NEGATIVE30C_MID_MODE    = {cl_info.CURRENT_LIMIT_MA_NEGATIVE40C_NEGATIVE30C_MID_MODE}
-CURRENT_LIMIT_MA_UNDER_NEGATIVE40C_MID_MODE          = {cl_info.CURRENT_LIMIT_MA_UNDER_NEGATIVE40C_MID_MODE}
-
-## HIGH SPEED
-
-CURRENT_LIMIT_MA_OVER85C_HIGH_MODE                   = {cl_info.CURRENT_LIMIT_MA_OVER85C_HIGH_MODE}
-CURRENT_LIMIT_MA_40C_85C_HIGH_MODE                   = {cl_info.CURRENT_LIMIT_MA_40C_85C_HIGH_MODE}
-CURRENT_LIMIT_MA_23C_40C_HIGH_MODE                   = {cl_info.CURRENT_LIMIT_MA_23C_40C_HIGH_MODE}
-CURRENT_LIMIT_MA_0C_23C_HIGH_MODE                    = {cl_info.CURRENT_LIMIT_MA_0C_23C_HIGH_MODE}
-CURRENT_LIMIT_MA_NEGATIVE20C_0C_HIGH_MODE            = {cl_info.CURRENT_LIMIT_MA_NEGATIVE20C_0C_HIGH_MODE}
-CURRENT_LIMIT_MA_NEGATIVE30C_NEGATIVE20C_HIGH_MODE = {cl_info.CURRENT_LIMIT_MA_NEGATIVE30C_NEGATIVE20C_HIGH_MODE}
-CURRENT_LIMIT_MA_NEGATIVE40C_NEGATIVE30C_HIGH_MODE = {cl_info.CURRENT_LIMIT_MA_NEGATIVE40C_NEGATIVE30C_HIGH_MODE}
-CURRENT_LIMIT_MA_UNDER_NEGATIVE40C_HIGH_MODE         = {cl_info.CURRENT_LIMIT_MA_UNDER_NEGATIVE40C_HIGH_MODE}
-
-## DEFAULT SPEED 
-
-CURRENT_LIMIT_MA_OVER85C_DEF_MODE                    = {cl_info.CURRENT_LIMIT_MA_OVER85C_DEF_MODE}
-CURRENT_LIMIT_MA_40C_85C_DEF_MODE                    = {cl_info.CURRENT_LIMIT_MA_40C_85C_DEF_MODE}
-CURRENT_LIMIT_MA_23C_40C_DEF_MODE                    = {cl_info.CURRENT_LIMIT_MA_23C_40C_DEF_MODE}
-CURRENT_LIMIT_MA_0C_23C_DEF_MODE                     = {cl_info.CURRENT_LIMIT_MA_0C_23C_DEF_MODE}
-CURRENT_LIMIT_MA_NEGATIVE20C_0C_DEF_MODE             = {cl_info.CURRENT_LIMIT_MA_NEGATIVE20C_0C_DEF_MODE}
-CURRENT_LIMIT_MA_NEGATIVE30C_NEGATIVE20C_DEF_MODE    = {cl_info.CURRENT_LIMIT_MA_NEGATIVE30C_NEGATIVE20C_DEF_MODE}
-CURRENT_LIMIT_MA_NEGATIVE40C_NEGATIVE30C_DEF_MODE    = {cl_info.CURRENT_LIMIT_MA_NEGATIVE40C_NEGATIVE30C_DEF_MODE}
-CURRENT_LIMIT_MA_UNDER_NEGATIVE40C_DEF_MODE          = {cl_info.CURRENT_LIMIT_MA_UNDER_NEGATIVE40C_DEF_MODE}
-
-## BOOST MODE
-
-CURRENT_LIMIT_MA_OVER85C_BOOST_MODE                   = {cl_info.CURRENT_LIMIT_MA_OVER85C_BOOST_MODE}
-CURRENT_LIMIT_MA_40C_85C_BOOST_MODE                   = {cl_info.CURRENT_LIMIT_MA_40C_85C_BOOST_MODE}
-CURRENT_LIMIT_MA_23C_40C_BOOST_MODE                   = {cl_info.CURRENT_LIMIT_MA_23C_40C_BOOST_MODE}
-CURRENT_LIMIT_MA_0C_23C_BOOST_MODE                    = {cl_info.CURRENT_LIMIT_MA_0C_23C_BOOST_MODE}
-CURRENT_LIMIT_MA_NEGATIVE20C_0C_BOOST_MODE            = {cl_info.CURRENT_LIMIT_MA_NEGATIVE20C_0C_BOOST_MODE}
-CURRENT_LIMIT_MA_NEGATIVE30C_NEGATIVE20C_BOOST_MODE   = {cl_info.CURRENT_LIMIT_MA_NEGATIVE30C_NEGATIVE20C_BOOST_MODE}
-CURRENT_LIMIT_MA_NEGATIVE40C_NEGATIVE30C_BOOST_MODE   = {cl_info.CURRENT_LIMIT_MA_NEGATIVE40C_NEGATIVE30C_BOOST_MODE}
-CURRENT_LIMIT_MA_UNDER_NEGATIVE40C_BOOST_MODE         = {cl_info.CURRENT_LIMIT_MA_UNDER_NEGATIVE40C_BOOST_MODE}
+{get_current_limit_txt(cl_info)}
 
 ## Memory Size Info
 
@@ -467,11 +550,16 @@ CURRENT_LIMIT_MA_UNDER_NEGATIVE40C_BOOST_MODE         = {cl_info.CURRENT_LIMIT_M
 '''
     return release_txt
 
-def create_release(release_obj):
+def create_release(release_obj, root=None, folder_suffix='', build_log=None):
+    """
+    Create the release folder, root is the worktree holding the build
+    outputs, the main repo by default. build_log is copied into the folder
+    when given.
+    """
     now = datetime.datetime.now()
     timestamp = now.strftime("%d-%b-%y_%H-%M-%S")
 
-    release_folder = RELEASES_DIR_PATH / timestamp
+    release_folder = RELEASES_DIR_PATH / f"{timestamp}{folder_suffix}"
 
     if not release_folder.exists():
         try:
@@ -494,36 +582,98 @@ def create_release(release_obj):
         f.write(note_text)
     
     #Copy the hexfile to the release folder
-    hex_file_path = pathlib.Path(f"{get_full_filename()}.hex")
-    release_hex_path = release_folder / f"{h2py_get_filename()}{'_DEBUG' if release_obj.debugging_enabled == 1 else ''}.hex"
-    empty_nvm_release_path = release_folder / NVRAM_CLEAR_FILENMAE
+    hex_file_path = in_tree(f"{get_full_filename()}.hex", root)
+    release_hex_name = f"{h2py_get_filename()}{'_DEBUG' if release_obj.debugging_enabled == 1 else ''}.hex"
 
     # Get the init NVRAM files
-    init_hex_nvm_path = f"{get_file_path()}/{release_obj.nvm_init_hex}"
-    init_json_nvm_path = f"{get_file_path()}/{release_obj.nvm_init_json}"
-
-    init_nvm_hex_release_path = release_folder/ f"{release_obj.nvm_init_hex}"
-    init_nvm_json_release_path = release_folder / f"{release_obj.nvm_init_json}"
-
-    shutil.copy(hex_file_path, release_hex_path)
-    shutil.copy(NVRAM_CLEAR_FILE_PATH, empty_nvm_release_path)
-    shutil.copy(init_hex_nvm_path, init_nvm_hex_release_path)
-    shutil.copy(init_json_nvm_path, init_nvm_json_release_path)
+    init_hex_nvm_path = in_tree(f"{get_file_path()}/{release_obj.nvm_init_hex}", root)
+    init_json_nvm_path = in_tree(f"{get_file_path()}/{release_obj.nvm_init_json}", root)
+
+    # Identical artifacts are stored once and hard linked in each release folder
+    entries, bytes_copied = add_files(str(ARTIFACT_STORE_PATH), str(release_folder), {
+        release_hex_name:           str(hex_file_path),
+        NVRAM_CLEAR_FILENMAE:       in_tree(NVRAM_CLEAR_FILE_PATH, root),
+        release_obj.nvm_init_hex:   init_hex_nvm_path,
+        release_obj.nvm_init_json:  init_json_nvm_path,
+    })
+
+    note_sha256, note_size = file_sha256(release_note_path)
+    entries.append({'name': str(release_note_filename), 'sha256': note_sha256, 'size': note_size})
+
+    # The build log is unique to this release, copy it instead of storing it
+    if build_log is not None:
+        build_log_name = os.path.basename(build_log)
+        shutil.copy2(build_log, release_folder / build_log_name)
+        log_sha256, log_size = file_sha256(release_folder / build_log_name)
+        entries.append({'name': build_log_name, 'sha256': log_sha256, 'size': log_size})
+        bytes_copied += log_size
+
+    write_manifest(str(release_folder), entries)
+    PROFILER.add_bytes(bytes_copied)
+
+    # Keep track of the firmware size across releases
+    append_history(str(SIZE_HISTORY_PATH), {
+        'timestamp':   timestamp,
+        'version':     release_obj.fw_version,
+        'commit':      release_obj.commit_hash,
+        'chip':        release_obj.chip_name,
+        'flash_used':  release_obj.mem_size.used_flash_bytes,
+        'flash_total': release_obj.mem_size.total_flash * 1024,
+        'ram_used':    release_obj.mem_size.used_ram_bytes,
+        'ram_total':   release_obj.mem_size.total_ram * 1024,
+        'sections':    release_obj.mem_size.sections,
+    })
+
+    # Index the release for the release_catalog.py queries
+    record_release({
+        'folder':      release_folder.name,
+        'created_at':  now.isoformat(timespec='seconds'),
+        'version':     release_obj.fw_version,
+        'commit_hash': release_obj.commit_hash,
+        'branch':      release_obj.branch,
+        'chip':        release_obj.chip_name,
+        'compiler':    release_obj.compiler,
+        'flash_used':  release_obj.mem_size.used_flash_bytes,
+        'flash_total': release_obj.mem_size.total_flash * 1024,
+        'ram_used':    release_obj.mem_size.used_ram_bytes,
+        'ram_total':   release_obj.mem_size.total_ram * 1024,
+    }, entries, str(CATALOG_PATH))
     
     print(f"Release Folder {release_folder} created Successfuly!")
 
-def publish_version(git):
+    return release_folder
+
+def build_variant_worktrees(variants, worktrees, base_dir):
+    """
+    Build every variant of the current commit in parallel, each in its own worktree.
+    Args:
+        variants (list): the PRODUCT values.
+        worktrees (dict): filled with variant -> worktree path, the caller removes them.
+        base_dir (str): directory of the worktrees and build logs, the caller removes it.
+    """
+    with PROFILER.subprocess():
+        create_worktrees(str(get_root_path()), variants, read_git_head(get_root_path()), base_dir, worktrees)
+        results = build_variants(worktrees, MAKEFILE_CONF_RELATIVE_PATH, BUILD_COMMAND)
+
+    for result in results:
+        BUILD_REPORTS[result['variant']] = result['report']
+        BUILD_LOGS[result['variant']] = result['log']
+        print(f"Variant {result['variant']} built in {result['duration']:.1f}s, log: {result['log']}")
+
+def publish_version(git, build=None):
     # Store current head to return to in case of an error.
     reset_git_hash = git.get_commit_hash()
     
     try:
         # No Other changes are in the repo, update the version
-        version_tag = update_version()
+        with PROFILER.phase('version update'):
+            version_tag = update_version()
         if git.curr_branch != GIT_DEVELOP_BRANCH_NAME:
             version_tag = version_tag + '@' + git.get_commit_hash()[:6]
 
         tag_is_set = False
-        changes = git.parse_diff()
+        with PROFILER.phase('diff validation'):
+            changes = git.parse_diff()
         print(len(changes))
         if len(changes) == 0:
             # No changes
@@ -555,7 +705,8 @@ def publish_version(git):
                     f.write(msg)
 
                 # Commit system_settings update of the version
-                git.commit(SYSTEM_SETTING_RELATIVE_PATH, commit_msgfile=GIT_COMMIT_MSG_RELATIVE_PATH)
+                with PROFILER.phase('commit'):
+                    git.commit(SYSTEM_SETTING_RELATIVE_PATH, commit_msgfile=GIT_COMMIT_MSG_RELATIVE_PATH)
 
                 # delete the commit file message once the changes are commited
                 try:
@@ -564,18 +715,27 @@ def publish_version(git):
                     print("Warning: commit message file not found")
 
                 # Build the source code before publishing
-                build_code()
+                with PROFILER.phase('build'):
+                    if build is not None:
+                        build()
+                    elif parse_args().no_build_cache:
+                        build_code()
+                    else:
+                        build_code_cached()
 
                 # Create a tag with the version number to trace back the releases
-                git.tag(version_tag)
+                with PROFILER.phase('tag'):
+                    git.tag(version_tag)
                 tag_is_set = True
 
                 print("Pushing the code to remote origin...")
                 # publish the release so that everyone has access to it.
-                git.push()
+                with PROFILER.phase('push'):
+                    git.push()
 
                 # publish the tag
-                git.tag_push(version_tag)
+                with PROFILER.phase('tag push'):
+                    git.tag_push(version_tag)
 
                 print(f"\nBranch {git.curr_branch} and tag {version_tag} successfully pushed to origin.")
 
@@ -596,13 +756,20 @@ def publish_version(git):
     return (version_tag, commit_title, commit_body)
 
 def main():
+    args = parse_args()
+    variants = [variant.strip() for variant in args.variants.split(',') if variant.strip()] if args.variants else []
+
     # Get the Makefile config and check Debugging enabled or not.
     with open(MAKEFILE_CONF_PATH, 'r') as f:
         makefile_config_text = f.read()
 
     debugging_enabled = 0
 
-    git = GitObj(get_root_path())
+    # imported here so that loading this module stays fast
+    from gitobj import GitObj
+
+    # Git facts are read from .git and cached, only the mutating operations spawn git
+    git = GitMetadata(GitObj(get_root_path()), get_root_path(), profiler=PROFILER)
 
     # Check the current branch
     if git.curr_branch != GIT_DEVELOP_BRANCH_NAME:
@@ -625,23 +792,42 @@ def main():
     # Checkout to develop branch (Not necessary)
     #git.checkout(args.branch)
 
-    # Return commit description
-    #commit_desc = ('v.9.999', 'title', 'body')
-    commit_desc = publish_version(git)
-
-    # Create a release folder
-    print("Creating release folder...")
+    # Variant worktrees and build logs live until their release folders are created
+    worktrees = {}
+    variants_dir = tempfile.mkdtemp(prefix='release_variants_') if variants else None
+    try:
+        make_release(git, variants, worktrees, variants_dir, makefile_config_text, debugging_enabled)
+    finally:
+        if worktrees:
+            remove_worktrees(str(get_root_path()), worktrees)
+        if variants_dir is not None:
+            try:
+                shutil.rmtree(variants_dir)
+            except OSError as e:
+                print(f"/!\\ Warning: could not remove {variants_dir}: {e}")
+
+def make_release(git, variants, worktrees, variants_dir, makefile_config_text, debugging_enabled):
+    """
+    Publish the version and create the release folders, one per variant when
+    variants are given, the worktrees are filled as they are created in
+    variants_dir.
+    """
     # Get the remote link for the source code
-    if re.search(r"^ssh://git@", git.get_remote_url()) is not None:
+    remote_url = git.get_remote_url()
+    if re.search(r"^ssh://git@", remote_url) is not None:
         # if MCI bitbucket is used SSH link is used
-        match = re.search(r"^ssh://git@(.*?)/(.*?)/(.*?)\.git$", git.get_remote_url())
-    elif re.search(r"^git@", git.get_remote_url()) is not None:
+        match = re.search(r"^ssh://git@(.*?)/(.*?)/(.*?)\.git$", remote_url)
+    elif re.search(r"^git@", remote_url) is not None:
         # if SSH link is used
-        match = re.search(r"^git@(.*?):(.*?)/(.*?)\.git$", git.get_remote_url())
+        match = re.search(r"^git@(.*?):(.*?)/(.*?)\.git$", remote_url)
     else:
         # if HTTPS link is used
-        match = re.search(r"^https://.*@(.*?)/(.*?)/(.*?)\.git$", git.get_remote_url())
-    
+        match = re.search(r"^https://.*@(.*?)/(.*?)/(.*?)\.git$", remote_url)
+
+    # Checked before publishing, nothing is pushed if the link cannot be used
+    if match is None:
+        raise IOError(f"Cannot parse the remote url {remote_url}")
+
     website = match.group(1)
     workspace = match.group(2)
     project = match.group(3)
@@ -649,15 +835,38 @@ def main():
     # Recreate a a vlid link for the origin
     website_url = f"https://{website}/{workspace}/{project}"
 
+    # Set the chip name
+    chip_name = DEFAULT_CHIP_NAME
+    match = re.search(r'PRODUCT\s*\?\=\s*(.*)\s*', makefile_config_text)
+    if match:
+        chip_name = 'MLX_' + match.group(1).strip()
+    else:
+        print(f"/!\\ Warning: PRODUCT is not set in the makefile config, releasing for {DEFAULT_CHIP_NAME}")
+
+    # Checked before publishing, the memory usage of an unknown chip cannot be computed
+    for name in (['MLX_' + variant for variant in variants] if variants else [chip_name]):
+        get_chip_memory_size(name)
+
+    # Return commit description
+    #commit_desc = ('v.9.999', 'title', 'body')
+    if variants:
+        # One version bump, commit and tag shared by all the variants, a failing
+        # variant build rolls the whole release back
+        commit_desc = publish_version(git, build=lambda: build_variant_worktrees(variants, worktrees, variants_dir))
+    else:
+        commit_desc = publish_version(git)
+
+    # Create a release folder
+    print("Creating release folder...")
+
     # Fill in the release obj to print it in Release Note.
     release_obj             = ReleaseObj()
     release_obj.fw_version  = commit_desc[0]
     release_obj.proj_name   = project
-    release_obj.chip_name   = 'MLX_81332' # to be set later
+    release_obj.chip_name   = chip_name
     release_obj.author      = git.get_author()
     release_obj.title       = commit_desc[1]
     release_obj.body        = commit_desc[2]
-    release_obj.compiler    = get_compiler_version().split('\n')[0].strip()
     release_obj.commit_hash = git.get_commit_hash()
     release_obj.source_path = website_url
     release_obj.branch      = git.curr_branch
@@ -665,13 +874,51 @@ def main():
     release_obj.mci_version = f"{h2py_get_filename()}".replace('_','.')
     release_obj.debugging_enabled = debugging_enabled
 
-    # Set the chip name
-    match = re.search(r'PRODUCT\s*\?\=\s*(.*)\s*', makefile_config_text)
-    if match:
-        release_obj.chip_name   = 'MLX_' + match.group(1)
-    
+    # Gather the release note data, none of these depend on each other
+    tasks = {
+        'ss_info':  get_system_settings_info,
+        'cl_info':  get_current_limit_info,
+        'compiler': get_toolchain_version,
+    }
+    if variants:
+        for variant in variants:
+            tasks[f'mem_size_{variant}'] = functools.partial(get_mlx_memory_size, 'MLX_' + variant, worktrees[variant])
+    else:
+        tasks['mem_size'] = functools.partial(get_mlx_memory_size, release_obj.chip_name)
+
+    with PROFILER.phase('data gathering'):
+        release_data = gather_release_data(tasks)
+    release_obj.ss_info  = release_data.ss_info
+    release_obj.cl_info  = release_data.cl_info
+    release_obj.compiler = release_data.compiler.split('\n')[0].strip()
+
     # Create the release folder
-    create_release(release_obj)
+    release_folders = {}
+    with PROFILER.phase('create release'):
+        if variants:
+            for variant in variants:
+                variant_obj           = copy.copy(release_obj)
+                variant_obj.chip_name = 'MLX_' + variant
+                variant_obj.mem_size  = getattr(release_data, f'mem_size_{variant}')
+                release_folders[variant] = create_release(variant_obj, root=worktrees[variant], folder_suffix=f'_{variant}',
+                                                          build_log=BUILD_LOGS.get(variant))
+        else:
+            release_obj.mem_size = release_data.mem_size
+            release_folders[None] = create_release(release_obj)
+
+    for variant, release_folder in release_folders.items():
+        PROFILER.write_json(release_folder / PROFILE_FILENAME)
+        with open(release_folder / BUILD_REPORT_FILENAME, 'w') as f:
+            json.dump(BUILD_REPORTS[variant], f, indent=4)
+
+def run():
+    """
+    Release and print the phase timings, even if the release failed.
+    """
+    try:
+        main()
+    finally:
+        PROFILER.print_summary()
 
 if __name__ == '__main__':
-    main()
+    run()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+
+'''
+@file release_catalog.py
+@brief: SQLite catalog of the releases.
+
+publish_release.py records every release it creates, with its version tag,
+commit hash, branch, chip, compiler, memory usage and artifact hashes, so
+lookups do not need to open every release folder.
+
+Usage:
+    python release_catalog.py hash <commit hash prefix>
+    python release_catalog.py latest [--chip MLX_81332] [--version v1.]
+    python release_catalog.py list [--chip MLX_81332] [--limit 20]
+    python release_catalog.py artifact <sha256>
+    python release_catalog.py import <release folder> [<release folder> ...]
+'''
+import os
+import re
+import sys
+import json
+import sqlite3
+import datetime
+from argparse import ArgumentParser, RawTextHelpFormatter
+
+from get_root_path import get_root_path
+
+CATALOG_PATH = str(get_root_path() / 'release' / 'catalog.sqlite')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS releases (
+    id           INTEGER PRIMARY KEY,
+    folder       TEXT UNIQUE NOT NULL,
+    created_at   TEXT NOT NULL,
+    version      TEXT NOT NULL,
+    commit_hash  TEXT,
+    branch       TEXT,
+    chip         TEXT,
+    compiler     TEXT,
+    flash_used   INTEGER,
+    flash_total  INTEGER,
+    ram_used     INTEGER,
+    ram_total    INTEGER
+);
+CREATE INDEX IF NOT EXISTS releases_commit_hash ON releases (commit_hash);
+CREATE INDEX IF NOT EXISTS releases_chip_version ON releases (chip, version);
+CREATE INDEX IF NOT EXISTS releases_created_at ON releases (created_at);
+
+CREATE TABLE IF NOT EXISTS artifacts (
+    release_id   INTEGER NOT NULL REFERENCES releases (id) ON DELETE CASCADE,
+    name         TEXT NOT NULL,
+    sha256       TEXT NOT NULL,
+    size         INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifacts_sha256 ON artifacts (sha256);
+CREATE INDEX IF NOT EXISTS artifacts_release_id ON artifacts (release_id);
+'''
+
+RELEASE_FIELDS = ('folder', 'created_at', 'version', 'commit_hash', 'branch', 'chip', 'compiler',
+                  'flash_used', 'flash_total', 'ram_used', 'ram_total')
+
+# Release folders are named after their creation time, optionally followed by _<variant>
+RELEASE_FOLDER_TIME_FORMAT = '%d-%b-%y_%H-%M-%S'
+RELEASE_FOLDER_RE_PATTERN = r'^(\d{2}-[A-Za-z]{3}-\d{2}_\d{2}-\d{2}-\d{2})(?:_.+)?$'
+
+# Release note lines used to import the folders created before the catalog
+RELEASE_NOTE_PATTERNS = {
+    'version':     r'^- \*\*Version\*\* : (.*)$',
+    'chip':        r'^- \*\*Chip\*\* : (.*)$',
+    'compiler':    r'^- Compiler : (.*)$',
+    'branch':      r'^- Source code remote branch : (.*)$',
+    'commit_hash': r'^- Release commit hash: (.*)$',
+}
+
+
+def connect(catalog_path=CATALOG_PATH):
+    connection = sqlite3.connect(catalog_path)
+    connection.row_factory = sqlite3.Row
+    connection.execute('PRAGMA foreign_keys = ON')
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def record_release(release, artifacts, catalog_path=CATALOG_PATH):
+    """
+    Add or replace a release in the catalog.
+    Args:
+        release (dict): RELEASE_FIELDS values, missing ones are stored as NULL.
+        artifacts (list): manifest entries, dicts with name, sha256 and size.
+    """
+    values = [release.get(field) for field in RELEASE_FIELDS]
+    with connect(catalog_path) as connection:
+        connection.execute('DELETE FROM releases WHERE folder = ?', (release['folder'],))
+        cursor = connection.execute(
+            f"INSERT INTO releases ({', '.join(RELEASE_FIELDS)}) VALUES ({', '.join('?' * len(RELEASE_FIELDS))})",
+            values)
+        connection.executemany('INSERT INTO artifacts (release_id, name, sha256, size) VALUES (?, ?, ?, ?)',
+                               [(cursor.lastrowid, a['name'], a['sha256'], a['size']) for a in artifacts])
+    connection.close()
+
+
+def find_by_commit(commit_prefix, catalog_path=CATALOG_PATH):
+    """
+    Releases whose commit hash starts with commit_prefix, newest first.
+    """
+    commit_prefix = commit_prefix.lower()
+    with connect(catalog_path) as connection:
+        # a range keeps the prefix search on the index
+        rows = connection.execute(
+            'SELECT * FROM releases WHERE commit_hash >= ? AND commit_hash < ? ORDER BY created_at DESC',
+            (commit_prefix, commit_prefix + '\uffff')).fetchall()
+    connection.close()
+    return rows
+
+
+def find_latest(chip=None, version_prefix=None, catalog_path=CATALOG_PATH):
+    """
+    The newest release, optionally for one chip and a version prefix like 'v1.'.
+    """
+    query = 'SELECT * FROM releases WHERE 1'
+    params = []
+    if chip is not None:
+        query += ' AND chip = ?'
+        params.append(chip)
+    if version_prefix is not None:
+        query += ' AND version >= ? AND version < ?'
+        params.extend([version_prefix, version_prefix + '\uffff'])
+    query += ' ORDER BY created_at DESC LIMIT 1'
+
+    with connect(catalog_path) as connection:
+        row = connection.execute(query, params).fetchone()
+    connection.close()
+    return row
+
+
+def list_releases(chip=None, limit=20, catalog_path=CATALOG_PATH):
+    query = 'SELECT * FROM releases'
+    params = []
+    if chip is not None:
+        query += ' WHERE chip = ?'
+        params.append(chip)
+    query += ' ORDER BY created_at DESC LIMIT ?'
+    params.append(limit)
+
+    with connect(catalog_path) as connection:
+        rows = connection.execute(query, params).fetchall()
+    connection.close()
+    return rows
+
+
+def find_by_artifact(sha256, catalog_path=CATALOG_PATH):
+    """
+    Releases shipping an artifact with this sha256.
+    """
+    with connect(catalog_path) as connection:
+        rows = connection.execute(
+            'SELECT releases.*, artifacts.name AS artifact FROM artifacts '
+            'JOIN releases ON releases.id = artifacts.release_id '
+            'WHERE artifacts.sha256 = ? ORDER BY releases.created_at DESC', (sha256.lower(),)).fetchall()
+    connection.close()
+    return rows
+
+
+def get_folder_time(release_folder):
+    """
+    Creation time of a release folder, from its name, or from its mtime when
+    the name does not hold a timestamp.
+    """
+    match = re.match(RELEASE_FOLDER_RE_PATTERN, os.path.basename(os.path.normpath(release_folder)))
+    if match:
+        try:
+            return datetime.datetime.strptime(match.group(1), RELEASE_FOLDER_TIME_FORMAT)
+        except ValueError:
+            pass
+    return datetime.datetime.fromtimestamp(os.path.getmtime(release_folder))
+
+
+def import_release_folder(release_folder, catalog_path=CATALOG_PATH):
+    """
+    Add a release folder created before the catalog, from its release note
+    and its manifest.json when there is one.
+    """
+    release_notes = [name for name in os.listdir(release_folder) if name.startswith('release_note_')]
+    if not release_notes:
+        raise IOError(f"No release note in {release_folder}")
+
+    with open(os.path.join(release_folder, release_notes[0]), 'r') as f:
+        note_text = f.read()
+
+    release = {
+        'folder': os.path.basename(os.path.normpath(release_folder)),
+        'created_at': get_folder_time(release_folder).isoformat(timespec='seconds'),
+    }
+    for field, pattern in RELEASE_NOTE_PATTERNS.items():
+        match = re.search(pattern, note_text, re.MULTILINE)
+        if match:
+            release[field] = match.group(1).strip()
+    if 'version' not in release:
+        raise IOError(f"No version in {release_notes[0]}")
+
+    artifacts = []
+    manifest_path = os.path.join(release_folder, 'manifest.json')
+    if os.path.isfile(manifest_path):
+        with open(manifest_path, 'r') as f:
+            artifacts = json.load(f)['files']
+
+    record_release(release, artifacts, catalog_path)
+    return release
+
+
+def print_releases(rows):
+    if not rows:
+        print("No release found.")
+        return
+    print(f"{'Created':<20} {'Version':<16} {'Chip':<12} {'Commit':<10} {'Branch':<16} Folder")
+    for row in rows:
+        print(f"{row['created_at']:<20} {row['version']:<16} {row['chip'] or '':<12} "
+              f"{(row['commit_hash'] or '')[:8]:<10} {row['branch'] or '':<16} {row['folder']}")
+
+
+def parse_args():
+    """Parse command line arguments"""
+    pars = ArgumentParser(formatter_class=RawTextHelpFormatter, description=__doc__)
+    pars.add_argument('-c', '--catalog', help='catalog file', type=str, default=CATALOG_PATH)
+    subparsers = pars.add_subparsers(dest='command', required=True)
+
+    by_hash = subparsers.add_parser('hash', help='releases built from a commit')
+    by_hash.add_argument('commit', help='commit hash or prefix')
+
+    latest = subparsers.add_parser('latest', help='the newest release')
+    latest.add_argument('--chip', help='e.g. MLX_81332', type=str, default=None)
+    latest.add_argument('--version', help='version prefix, e.g. v1.', type=str, default=None)
+
+    listing = subparsers.add_parser('list', help='the newest releases')
+    listing.add_argument('--chip', help='e.g. MLX_81332', type=str, default=None)
+    listing.add_argument('--limit', help='number of releases', type=int, default=20)
+
+    by_artifact = subparsers.add_parser('artifact', help='releases shipping a file')
+    by_artifact.add_argument('sha256', help='sha256 of the file')
+
+    importing = subparsers.add_parser('import', help='add existing release folders')
+    importing.add_argument('folders', nargs='+', help='release folders')
+
+    return pars.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.command == 'hash':
+        print_releases(find_by_commit(args.commit, args.catalog))
+    elif args.command == 'latest':
+        row = find_latest(args.chip, args.version, args.catalog)
+        print_releases([row] if row is not None else [])
+    elif args.command == 'list':
+        print_releases(list_releases(args.chip, args.limit, args.catalog))
+    elif args.command == 'artifact':
+        print_releases(find_by_artifact(args.sha256, args.catalog))
+    else:
+        failed = False
+        for folder in args.folders:
+            try:
+                release = import_release_folder(folder, args.catalog)
+                print(f"{folder}: imported {release['version']}")
+            except (OSError, ValueError, KeyError) as e:
+                failed = True
+                print(f"{folder}: {e}")
+        sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+'''
+@file variant_builds.py
+@brief: Build several PRODUCT variants of the firmware in parallel.
+
+Each variant gets its own detached git worktree of the release commit, its
+PRODUCT is set in Makefile.configure.mk and build.bat runs in that worktree.
+The builds run in a process pool, each one logging its output to
+build_<variant>.log next to its worktree, so the logs outlive the worktrees.
+The output is analyzed as it is logged, see build_analyzer.py.
+'''
+import os
+import re
+import time
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+from build_analyzer import analyze_stream
+
+PRODUCT_RE_PATTERN = r'^(PRODUCT\s*\?\=\s*)(.*?)(\s*)$'
+BUILD_COMMAND = 'build.bat'
+
+
+def run_git(repo_path, *args):
+    try:
+        return subprocess.check_output(['git', *args], cwd=repo_path, stderr=subprocess.STDOUT).decode()
+    except subprocess.CalledProcessError as e:
+        raise IOError(f"git {' '.join(args)} failed with return code {e.returncode}, Msg: {e.output.decode()}")
+
+
+def create_worktrees(repo_path, variants, commit, base_dir, worktrees):
+    """
+    Create a detached worktree of `commit` per variant.
+    Args:
+        worktrees (dict): filled with variant -> worktree path as they are
+            created, so the caller can remove them even if one fails.
+    """
+    for variant in variants:
+        worktree_path = os.path.join(base_dir, variant)
+        run_git(repo_path, 'worktree', 'add', '--detach', worktree_path, commit)
+        worktrees[variant] = worktree_path
+
+
+def remove_worktrees(repo_path, worktrees):
+    for variant, worktree_path in list(worktrees.items()):
+        try:
+            run_git(repo_path, 'worktree', 'remove', '--force', worktree_path)
+            del worktrees[variant]
+        except IOError as e:
+            print(f"/!\\ Warning: could not remove worktree {worktree_path}: {e}")
+    try:
+        run_git(repo_path, 'worktree', 'prune')
+    except IOError as e:
+        print(f"/!\\ Warning: could not prune worktrees: {e}")
+
+
+def set_product(makefile_conf_path, product):
+    """
+    Set the PRODUCT of a Makefile.configure.mk.
+    """
+    with open(makefile_conf_path, 'r') as f:
+        text = f.read()
+
+    text, count = re.subn(PRODUCT_RE_PATTERN, f'\\g<1>{product}\\g<3>', text, count=1, flags=re.MULTILINE)
+    if count == 0:
+        raise IOError(f"No PRODUCT ?= line found in {makefile_conf_path}")
+
+    with open(makefile_conf_path, 'w') as f:
+        f.write(text)
+
+
+def build_variant(worktree_path, product, makefile_conf_relpath, build_command=BUILD_COMMAND):
+    """
+    Build one variant in its worktree, runs in a worker process.
+    Returns:
+        dict: variant, returncode, log path, duration in seconds and the
+            build_analyzer report.
+    """
+    start = time.perf_counter()
+    set_product(os.path.join(worktree_path, makefile_conf_relpath), product)
+
+    log_path = os.path.join(os.path.dirname(worktree_path), f'build_{product}.log')
+    with open(log_path, 'w') as log_file:
+        output = subprocess.Popen(build_command,
+                                  cwd=worktree_path,
+                                  stderr=subprocess.STDOUT,
+                                  stdout=subprocess.PIPE,
+                                  shell=True)
+        analyzer = analyze_stream(output.stdout, echo=lambda line: log_file.write(line + '\n'))
+        returncode = output.wait()
+
+    return {
+        'variant': product,
+        'returncode': returncode,
+        'log': log_path,
+        'duration': time.perf_counter() - start,
+        'report': analyzer.to_dict(),
+    }
+
+
+def build_variants(worktrees, makefile_conf_relpath, build_command=BUILD_COMMAND, max_workers=None):
+    """
+    Build every variant in parallel.
+    Args:
+        worktrees (dict): variant -> worktree path.
+    Returns:
+        list: the build_variant() results.
+    Raises:
+        IOError: listing every variant that failed to build.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers or len(worktrees)) as executor:
+        futures = {variant: executor.submit(build_variant, worktree_path, variant, makefile_conf_relpath, build_command)
+                   for variant, worktree_path in worktrees.items()}
+
+    results = []
+    errors = []
+    for variant, future in futures.items():
+        if future.exception() is not None:
+            errors.append(f"{variant}: {future.exception()}")
+            continue
+        result = future.result()
+        results.append(result)
+        if result['returncode'] != 0:
+            errors.append(f"{variant}: build failed with return code {result['returncode']}, see {result['log']}")
+
+    if errors:
+        raise IOError("Variant builds failed:\n" + "\n".join(errors))
+
+    return results